@@ -98,6 +98,45 @@ class AbstractFileInterface(object):
 	def getFilePathIterator(self):
 		raise Exception("Subclasses must overwrite this method: getFilePathIterator()")
 
+	#
+	# Update the file index in place to match a newer version of the index file. Only the differences are applied.
+	#
+	# @return	dict		Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#						removed (key "removed") and changed (key "changed").
+	#
+	def refreshIndex(self):
+		raise Exception("Subclasses must overwrite this method: refreshIndex()")
+
+	#
+	# Apply a delta file to the file index in place. See <c>FileIndex.applyDeltaFile()</c> for a description of the format.
+	#
+	# @param		string deltaFilePath		The path of a local delta file.
+	# @return		dict						Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#											removed (key "removed") and changed (key "changed").
+	#
+	def applyIndexDelta(self, deltaFilePath):
+		raise Exception("Subclasses must overwrite this method: applyIndexDelta()")
+
+	#
+	# Get the directory tree of the files this object can provide. Each node of the tree provides the number of files,
+	# their total size and the newest modification time stamp, both for the files directly contained and for the whole
+	# subtree.
+	#
+	# @return	DirectoryTreeNode	Returns the root node of the tree.
+	#
+	def getDirectoryTree(self):
+		raise Exception("Subclasses must overwrite this method: getDirectoryTree()")
+
+	#
+	# Get a node of the directory tree.
+	#
+	# @param		string relDirPath		A relative directory path. Specify "" for the root directory.
+	# @return		DirectoryTreeNode		Returns the node or <c>None</c> if there is no such directory.
+	#
+	def getDirectoryInfo(self, relDirPath):
+		tree = self.getDirectoryTree()
+		return tree.getNode(relDirPath)
+
 	#
 	# Return a file tuple based on the path specified.
 	# If the file is located on a remote system it will be
@@ -10,23 +10,92 @@ import sys
 import codecs
 import random
 import string
+import re
 
 
 
 
+#
+# Base class of all file path filters.
+#
+# Filters that only need the file path overwrite <c>canAccept()</c>. If a filter can be expressed as a regular
+# expression it should overwrite <c>_getRegExPattern()</c> as well: Combinations of such filters are then compiled
+# into a single regular expression. Filters that need the file size or time stamp overwrite <c>canAcceptFile()</c>
+# and <c>acceptMany()</c>.
+#
 class AbstractFilePathFilter(object):
 
+	#
+	# Check if a file path is accepted by this filter.
+	#
+	# @param		str filePath		The relative file path
+	# @return		bool				Returns <c>True</c> if the file is accepted.
+	#
 	def canAccept(self, filePath):
 		raise Exception("Subclasses must implement this method: canAccept()")
 
-
-
-
-
-
-
-
-
+	#
+	# Check if a file is accepted by this filter.
+	#
+	# @param		str filePath		The relative file path
+	# @param		int fileSize		The size of the file in bytes
+	# @param		int timeStampNS		The last modification time stamp in nanoseconds since epoch
+	# @return		bool				Returns <c>True</c> if the file is accepted.
+	#
+	def canAcceptFile(self, filePath, fileSize, timeStampNS):
+		return self.canAccept(filePath)
+
+	#
+	# Check a whole set of files at once. This is significantly faster than invoking <c>canAccept()</c>
+	# for each file.
+	#
+	# @param		str[] filePaths			The relative file paths
+	# @param		int[] fileSizes			(optional) The sizes of the files in bytes. Required if this filter checks file sizes.
+	# @param		int[] timeStampsNS		(optional) The last modification time stamps of the files in nanoseconds since epoch.
+	#										Required if this filter checks time stamps.
+	# @return		bool[]					Returns a list containing a boolean value for each file.
+	#
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		regEx = self._getCompiledRegEx()
+		if regEx != None:
+			m = regEx.match
+			return [ m(filePath) is not None for filePath in filePaths ]
+		if (fileSizes is None) or (timeStampsNS is None):
+			return [ self.canAccept(filePath) for filePath in filePaths ]
+		else:
+			return [ self.canAcceptFile(filePath, fileSize, timeStampNS) for (filePath, fileSize, timeStampNS) in zip(filePaths, fileSizes, timeStampsNS) ]
+
+	#
+	# Returns a regular expression pattern that matches (from the beginning of a path) exactly those paths accepted by this filter.
+	#
+	# @return		str			Returns the pattern or <c>None</c> if this filter can not be expressed as regular expression.
+	#
+	def _getRegExPattern(self):
+		return None
+
+	#
+	# Returns the compiled regular expression of this filter.
+	#
+	# @return		re.Pattern		Returns the regular expression or <c>None</c> if this filter can not be expressed as regular expression.
+	#
+	def _getCompiledRegEx(self):
+		return None
+
+	#
+	# Compile the specified pattern.
+	#
+	# @param		str pattern			A regular expression pattern or <c>None</c>.
+	# @return		re.Pattern			Returns the compiled regular expression or <c>None</c> if no pattern has been specified
+	#									or the pattern could not be compiled.
+	#
+	@staticmethod
+	def _compileRegExPattern(pattern):
+		if pattern is None:
+			return None
+		try:
+			return re.compile(pattern, re.DOTALL)
+		except re.error:
+			return None
 
 
 
@@ -7,6 +7,11 @@ import os
 import time
 import sys
 import datetime
+import stat
+import collections
+import queue
+import concurrent.futures
+import io
 
 
 
@@ -88,6 +93,10 @@ class AbstractShare(object):
 	#
 	# Write text or binary data file.
 	#
+	# The data can be provided as a string, as any object supporting the buffer protocol (such as <c>bytes</c>, <c>bytearray</c>,
+	# <c>memoryview</c>, <c>array</c> or <c>mmap</c>) or as an iterable of such chunks. Buffers are written without copying them.
+	# Chunks are written to the share as they are provided, so the data never needs to exist in memory as a whole.
+	#
 	# Note: Text is written UTF-8 encoded. If you require different encoding, convert the text to binary yourself before invoking
 	# this method.
 	#
@@ -97,19 +106,201 @@ class AbstractShare(object):
 		elif isinstance(fileData, (bytearray, bytes)):
 			pass
 		else:
-			raise Exception("Data must be provided as string or byte object!")
+			try:
+				fileData = AbstractShare._toByteView(fileData)
+			except TypeError:
+				if hasattr(fileData, "__iter__"):
+					self._writeChunksToFile(remoteOutputFilePath, AbstractShare.__iterateByteChunks(fileData), timeStamp)
+					return
+				raise Exception("Data must be provided as string, byte buffer or iterable of these!")
 
 		self._writeAllDataToFile(remoteOutputFilePath, fileData, timeStamp)
 	#
 
+	#
+	# Get a view of the bytes of an object supporting the buffer protocol. A copy is made only if the buffer is not contiguous.
+	#
+	@staticmethod
+	def _toByteView(data):
+		view = memoryview(data)
+		if not view.c_contiguous:
+			return memoryview(view.tobytes())
+		if (view.format == "B") and (view.ndim == 1):
+			return view
+		return view.cast("B")
+	#
 
+	@staticmethod
+	def __iterateByteChunks(chunks):
+		for chunk in chunks:
+			if isinstance(chunk, str):
+				yield chunk.encode("utf-8")
+			elif isinstance(chunk, (bytearray, bytes)):
+				yield chunk
+			else:
+				try:
+					yield AbstractShare._toByteView(chunk)
+				except TypeError:
+					raise Exception("Chunks must be provided as string or byte buffer!")
+	#
 
+	#
+	# Write the specified data to a file.
+	#
+	# @param		bytes|bytearray|memoryview fileData		The data to write
+	# @param		int timeStamp							(optional) The modification time stamp in milliseconds since epoch
+	#
 	def _writeAllDataToFile(self, remoteOutputFilePath, fileData, timeStamp = None):
 		pass
+	#
+
+	#
+	# Write a sequence of chunks to a file. The generic implementation writes to a stream returned by <c>open()</c> and
+	# ignores the time stamp.
+	#
+	# @param		iterator chunks				An iterator over <c>bytes</c>, <c>bytearray</c> or <c>memoryview</c> objects
+	# @param		int timeStamp				(optional) The modification time stamp in milliseconds since epoch
+	#
+	def _writeChunksToFile(self, remoteOutputFilePath, chunks, timeStamp = None):
+		with self.open(remoteOutputFilePath, "wb") as fout:
+			for chunk in chunks:
+				fout.write(chunk)
+	#
 
 	def readAllDataFromFile(self, remoteInputFilePath):
 		pass
 
+	#
+	# Download the specified file from the share to a local file. The modification time stamp is preserved.
+	#
+	# @param		str remoteInputFilePath			The path of the file on the share
+	# @param		str localOutputFilePath			The path of the local file that will receive the data
+	#
+	def downloadFile(self, remoteInputFilePath, localOutputFilePath):
+		statTuple = self.stat(remoteInputFilePath)
+		if (statTuple is None) or (statTuple[1] != 'f'):
+			raise Exception("No such file: " + remoteInputFilePath)
+		fileData = self.readAllDataFromFile(remoteInputFilePath)
+		with open(localOutputFilePath, "wb") as fout:
+			fout.write(fileData)
+		os.utime(localOutputFilePath, (statTuple[6] / 1000, statTuple[6] / 1000))
+	#
+
+	#
+	# Open a file on the share as a buffered binary stream. Data is transferred as it is read or written, so the file
+	# is never loaded into memory as a whole.
+	#
+	# @param		str path				The absolute path of the file.
+	# @param		str mode				One of the binary modes of <c>open()</c>: "rb", "wb", "ab", "r+b", "w+b" or "a+b".
+	# @param		int bufferSize			The size of the buffer.
+	# @return		io.BufferedIOBase		Returns a file object supporting <c>read()</c>, <c>readinto()</c>, <c>write()</c> and
+	#										<c>seek()</c> depending on the mode. The file object should be used as a context manager
+	#										or closed explicitely.
+	#
+	def open(self, path, mode = "rb", bufferSize = 65536):
+		pass
+	#
+
+	#
+	# Parse a mode string as accepted by <c>open()</c>.
+	#
+	# @return		tuple			Returns a tuple of booleans: Readable, writable, create, truncate and append.
+	#
+	def _parseOpenMode(self, mode):
+		if mode.endswith("b"):
+			m = mode[:-1]
+		elif mode.endswith("b+"):
+			m = mode[:-2] + "+"
+		else:
+			raise Exception("Only binary modes are supported: " + repr(mode))
+		if m == "r":
+			return (True, False, False, False, False)
+		elif m == "w":
+			return (False, True, True, True, False)
+		elif m == "a":
+			return (False, True, True, False, True)
+		elif m == "r+":
+			return (True, True, False, False, False)
+		elif m == "w+":
+			return (True, True, True, True, False)
+		elif m == "a+":
+			return (True, True, True, False, True)
+		else:
+			raise Exception("Invalid mode: " + repr(mode))
+	#
+
+	#
+	# Wrap a raw file stream by a buffered stream suitable for the access requested.
+	#
+	def _wrapRawFileStream(self, rawFileStream, bufferSize):
+		if rawFileStream.readable():
+			if rawFileStream.writable():
+				return io.BufferedRandom(rawFileStream, bufferSize)
+			else:
+				return io.BufferedReader(rawFileStream, bufferSize)
+		else:
+			return io.BufferedWriter(rawFileStream, bufferSize)
+	#
+
+	#
+	# Iterate over the content of a file in chunks.
+	#
+	# @param		str path				The absolute path of the file.
+	# @param		int chunkSize			The maximum size of each chunk.
+	# @return		iterator<bytes>			Returns an iterator over chunks of data. Only the last chunk might be smaller than
+	#										<c>chunkSize</c>.
+	#
+	def iterChunks(self, path, chunkSize = 65536):
+		assert isinstance(chunkSize, int)
+		assert chunkSize > 0
+		with self.open(path, "rb", bufferSize = chunkSize) as fin:
+			while True:
+				chunk = fin.read(chunkSize)
+				if not chunk:
+					break
+				yield chunk
+	#
+
+	#
+	# Read a part of a file.
+	#
+	# @param		str path				The absolute path of the file.
+	# @param		int offset				The position to start reading at.
+	# @param		int length				The number of bytes to read.
+	# @return		bytes					Returns the data read. This is less than <c>length</c> bytes if the end of the file
+	#										has been reached.
+	#
+	def readRange(self, path, offset, length):
+		return self.readRanges(path, [ (offset, length) ])[0]
+	#
+
+	#
+	# Read several parts of a file.
+	#
+	# @param		str path				The absolute path of the file.
+	# @param		tuple[] ranges			A list of tuples containing an offset and a length each.
+	# @return		bytes[]					Returns a list containing the data read for every range.
+	#
+	def readRanges(self, path, ranges):
+		ranges = self._verifyRanges(ranges)
+		ret = []
+		with self.open(path, "rb", bufferSize = 4096) as fin:
+			for (offset, length) in ranges:
+				fin.seek(offset)
+				ret.append(fin.read(length))
+		return ret
+	#
+
+	def _verifyRanges(self, ranges):
+		ranges = list(ranges)
+		for (offset, length) in ranges:
+			assert isinstance(offset, int)
+			assert offset >= 0
+			assert isinstance(length, int)
+			assert length >= 0
+		return ranges
+	#
+
 	def deleteEmptyDirectory(self, path):
 		pass
 
@@ -119,6 +310,105 @@ class AbstractShare(object):
 	def createDirectory(self, path):
 		pass
 
+	#
+	# The number of operations the batch methods perform concurrently if no other value is specified.
+	#
+	def _getBatchConcurrency(self):
+		return 1
+	#
+
+	#
+	# Perform an operation for many jobs. Up to <c>numThreads</c> jobs are performed concurrently.
+	#
+	# @return		list			Returns a list containing a result for every job in the order the jobs have been specified.
+	#								If a job failed the exception raised is stored instead.
+	#
+	def __performMany(self, fnJob, jobs, numThreads):
+		if numThreads is None:
+			numThreads = self._getBatchConcurrency()
+		assert isinstance(numThreads, int)
+		assert numThreads > 0
+
+		def performJob(job):
+			try:
+				return fnJob(*job)
+			except Exception as e:
+				return e
+
+		if numThreads == 1:
+			return [ performJob(job) for job in jobs ]
+
+		ret = []
+		pending = collections.deque()
+		with concurrent.futures.ThreadPoolExecutor(max_workers=numThreads) as executor:
+			for job in jobs:
+				if len(pending) >= 2 * numThreads:
+					ret.append(pending.popleft().result())
+				pending.append(executor.submit(performJob, job))
+			while pending:
+				ret.append(pending.popleft().result())
+		return ret
+	#
+
+	#
+	# Upload many local files to the share.
+	#
+	# @param		iterable<tuple> jobs		Tuples containing the path of the local file, the path of the file on the share and
+	#											optionally a boolean value specifying if the local file should be removed after upload.
+	# @param		int numThreads				(optional) The number of uploads to perform concurrently.
+	# @return		list						Returns a list containing <c>None</c> for every successful job or the exception raised.
+	#
+	def uploadMany(self, jobs, numThreads = None):
+		return self.__performMany(self.uploadLocalFile, jobs, numThreads)
+	#
+
+	#
+	# Download many files from the share to local files.
+	#
+	# @param		iterable<tuple> jobs		Tuples containing the path of the file on the share and the path of the local file.
+	# @param		int numThreads				(optional) The number of downloads to perform concurrently.
+	# @return		list						Returns a list containing <c>None</c> for every successful job or the exception raised.
+	#
+	def downloadMany(self, jobs, numThreads = None):
+		return self.__performMany(self.downloadFile, jobs, numThreads)
+	#
+
+	#
+	# Read many files.
+	#
+	# @param		iterable<str> paths			The paths of the files on the share.
+	# @param		int numThreads				(optional) The number of files to read concurrently.
+	# @return		list						Returns a list containing the data of every file or the exception raised.
+	#
+	def readMany(self, paths, numThreads = None):
+		return self.__performMany(self.readAllDataFromFile, ((path,) for path in paths), numThreads)
+	#
+
+	#
+	# Write many files.
+	#
+	# @param		iterable<tuple> jobs		Tuples containing the path of the file on the share, the data to write and optionally
+	#											a time stamp in milliseconds since epoch.
+	# @param		int numThreads				(optional) The number of files to write concurrently.
+	# @return		list						Returns a list containing <c>None</c> for every successful job or the exception raised.
+	#
+	def writeMany(self, jobs, numThreads = None):
+		return self.__performMany(self.writeAllDataToFile, jobs, numThreads)
+	#
+
+	#
+	# Delete many files.
+	#
+	# @param		iterable<str> paths					The paths of the files on the share.
+	# @param		bool bIgnoreErrorIfNotExists		Specify <c>True</c> here to ignore files that do not exist.
+	# @param		int numThreads						(optional) The number of files to delete concurrently.
+	# @return		list								Returns a list containing the return value of <c>deleteFile()</c> for every
+	#													file or the exception raised.
+	#
+	def deleteMany(self, paths, bIgnoreErrorIfNotExists = False, numThreads = None):
+		return self.__performMany(self.deleteFile, ((path, bIgnoreErrorIfNotExists) for path in paths), numThreads)
+	#
+
 	#
 	# Verifies the specified path. Processing the path by this method will recognize "." and ".." elements.
 	#
@@ -208,9 +498,67 @@ class AbstractShare(object):
 		return self._normalizeAndVerifyAbsolutePath(path)
 	#
 
+	#
+	# Retrieve information about a file or directory.
+	#
+	# @param		str path		The absolute path of the file or directory.
+	# @return		tuple			Returns <c>None</c> if there is no such file or directory. Otherwise a tuple is returned
+	#								containing the same data as a tuple returned by <c>listDirectoryContent()</c>.
+	#
+	def stat(self, path):
+		pass
+	#
+
+	#
+	# Build a tuple describing a directory entry as returned by <c>stat()</c> and <c>listDirectoryContent()</c>.
+	#
+	def _buildStatTuple(self, name, st_mode, st_uid, st_gid, st_size, st_mtime):
+		if stat.S_ISDIR(st_mode):
+			return (name, 'd', st_mode, st_uid, st_gid, None, None)
+		elif stat.S_ISREG(st_mode):
+			return (name, 'f', st_mode, st_uid, st_gid, st_size, int(st_mtime) * 1000)
+		else:
+			return (name, '?', st_mode, st_uid, st_gid, st_size, int(st_mtime) * 1000)
+	#
+
+	#
+	# Checks if the specified path exists.
+	#
+	# @param		str path		The path of a file or directory.
+	# @return		bool			Returns <c>True</c> or <c>False</c>.
+	#
+	def exists(self, path):
+		return self.stat(path) != None
+	#
+
+	#
+	# Checks if the specified path exists and is a directory.
+	#
+	# @param		str path		The directory path.
+	# @return		bool			Returns <c>True</c> or <c>False</c>.
+	#
+	def isDirectory(self, path):
+		statTuple = self.stat(path)
+		return (statTuple != None) and (statTuple[1] == 'd')
+	#
+
+	#
+	# Checks if the specified path exists and is a regular file.
+	#
+	# @param		str path		The file path.
+	# @return		bool			Returns <c>True</c> or <c>False</c>.
+	#
+	def isFile(self, path):
+		statTuple = self.stat(path)
+		return (statTuple != None) and (statTuple[1] == 'f')
+	#
+
 	#
 	# Ensure that the specified directory exists.
 	#
+	# First the directory is created directly. Only if this fails the path is walked back to the first existing parent
+	# directory and the missing directories are created from there.
+	#
 	# @param		str path		The directory path to create.
 	# @return		bool			Returns <c>True</c> if at least one directory needed to be created. <c>False</c> is returned
 	#								if all directories already existed.
@@ -220,22 +568,34 @@ class AbstractShare(object):
 		if path == "/":
 			return False
 
-		pathElements = path[1:].split("/")
-
-		bDirectoryCreated = False
-
-		p = "/"
-		for pathElement in pathElements:
-			dirNames = self.listDirectoryContentNames(p, bIncludeSubDirs = True, bIncludeFiles = False, bIncludeOthers = False)
-			if pathElement not in dirNames:
-				# directory not found => create it
-				self.createDirectory(p + "/" + pathElement)
-				bDirectoryCreated = True
-			if len(p) > 1:
-				p += "/"
-			p += pathElement
+		try:
+			self.createDirectory(path)
+			return True
+		except Exception as e:
+			statTuple = self.stat(path)
+			if statTuple != None:
+				if statTuple[1] == 'd':
+					return False
+				raise Exception("Not a directory: " + path)
+
+		# walk back to the first existing directory
+		missingDirPaths = [ path ]
+		p = path
+		while True:
+			p = p[0:p.rfind("/")]
+			if not p:
+				break
+			statTuple = self.stat(p)
+			if statTuple != None:
+				if statTuple[1] != 'd':
+					raise Exception("Not a directory: " + p)
+				break
+			missingDirPaths.append(p)
+
+		for p in reversed(missingDirPaths):
+			self.createDirectory(p)
 
-		return bDirectoryCreated
+		return True
 	#
 
 	#
@@ -248,20 +608,7 @@ class AbstractShare(object):
 		path = self._normalizeAndVerifyAbsolutePath(path)
 		if path == "/":
 			return True
-
-		pathElements = path[1:].split("/")
-
-		p = "/"
-		for pathElement in pathElements:
-			dirNames = self.listDirectoryContentNames(p, bIncludeSubDirs = True, bIncludeFiles = False, bIncludeOthers = False)
-			if pathElement not in dirNames:
-				# directory not found => create it
-				return False
-			if len(p) > 1:
-				p += "/"
-			p += pathElement
-
-		return True
+		return self.isDirectory(path)
 	#
 
 	#
@@ -271,12 +618,138 @@ class AbstractShare(object):
 	# @return		str[]			Returns a list of absolut paths.
 	#
 	def listAllDirectoriesRecursively(self, path = "/"):
-		ret = []
-		for dirName in self.listDirectoryContentNames(path, bIncludeSubDirs = True, bIncludeFiles = False, bIncludeOthers = False):
-			fullP = os.path.join(path, dirName)
-			ret.append(fullP)
-			ret.extend(self.listAllDirectoriesRecursively(fullP))
-		return ret
+		return [ entry[0] for entry in self.walk(path, bIncludeFiles = False, bIncludeOthers = False) ]
+	#
+
+
+
+	#
+	# Walk over all directory entries below the specified path. Entries are provided as soon as the directory they are
+	# contained in has been listed.
+	#
+	# If only a single thread is used entries are provided in depth first order: Every directory is followed by its content.
+	# If multiple threads are used up to that number of directories are listed at the same time. In that case entries are
+	# provided in the order the listings complete.
+	#
+	# @param		str path				The (existing) absolute path to start at. This directory itself is not included.
+	# @param		callable fnPrune		(optional) A function that receives an entry tuple of a directory. If this function
+	#										returns <c>True</c> the directory is skipped: Neither the directory nor its content
+	#										is provided.
+	# @param		int maxDepth			(optional) The maximum depth to descend to. The entries directly within the start
+	#										directory have a depth of 1.
+	# @param		int numThreads			The maximum number of directories to list at the same time.
+	# @param		bool bIncludeFiles		Specify <c>True</c> here to include files.
+	# @param		bool bIncludeOthers		Specify <c>True</c> here to include any other kind of file like entry.
+	# @return		iterator<tuple>			Returns an iterator over tuples in the same format as returned by <c>listDirectoryContent()</c>,
+	#										but with the absolute path of the entry instead of its name.
+	#
+	def walk(self, path = "/", fnPrune = None, maxDepth = None, numThreads = 1, bIncludeFiles = True, bIncludeOthers = True):
+		path = self._normalizeAndVerifyAbsolutePath(path)
+		assert isinstance(numThreads, int)
+		assert numThreads > 0
+		if maxDepth != None:
+			assert isinstance(maxDepth, int)
+			if maxDepth <= 0:
+				return
+
+		listers = self._acquireDirectoryListers(numThreads)
+		try:
+			if len(listers) == 1:
+				yield from self.__walkSerial(listers[0], path, fnPrune, maxDepth, bIncludeFiles, bIncludeOthers)
+			else:
+				yield from self.__walkParallel(listers, path, fnPrune, maxDepth, bIncludeFiles, bIncludeOthers)
+		finally:
+			self._releaseDirectoryListers(listers)
+	#
+
+
+
+	def __walkListing(self, fnList, dirPath, bIncludeFiles, bIncludeOthers):
+		if dirPath.endswith("/"):
+			prefix = dirPath
+		else:
+			prefix = dirPath + "/"
+		return [ (prefix + entry[0],) + tuple(entry[1:]) for entry in fnList(dirPath, True, bIncludeFiles, bIncludeOthers) ]
+	#
+
+
+
+	def __walkSerial(self, fnList, path, fnPrune, maxDepth, bIncludeFiles, bIncludeOthers):
+		stack = [ iter(self.__walkListing(fnList, path, bIncludeFiles, bIncludeOthers)) ]
+		while stack:
+			entry = next(stack[-1], None)
+			if entry is None:
+				stack.pop()
+				continue
+			if entry[1] == 'd':
+				if (fnPrune != None) and fnPrune(entry):
+					continue
+				yield entry
+				if (maxDepth is None) or (len(stack) < maxDepth):
+					stack.append(iter(self.__walkListing(fnList, entry[0], bIncludeFiles, bIncludeOthers)))
+			else:
+				yield entry
+	#
+
+
+
+	def __walkParallel(self, listers, path, fnPrune, maxDepth, bIncludeFiles, bIncludeOthers):
+		freeListers = queue.Queue()
+		for fnList in listers:
+			freeListers.put(fnList)
+
+		def listDir(dirPath):
+			fnList = freeListers.get()
+			try:
+				return self.__walkListing(fnList, dirPath, bIncludeFiles, bIncludeOthers)
+			finally:
+				freeListers.put(fnList)
+
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(listers))
+		pendingDirs = collections.deque()
+		futures = {}
+		try:
+			pendingDirs.append((path, 0))
+			while pendingDirs or futures:
+				while pendingDirs and (len(futures) < len(listers)):
+					(dirPath, depth) = pendingDirs.popleft()
+					futures[executor.submit(listDir, dirPath)] = depth + 1
+				(done, notDone) = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+				for future in done:
+					depth = futures.pop(future)
+					for entry in future.result():
+						if entry[1] == 'd':
+							if (fnPrune != None) and fnPrune(entry):
+								continue
+							if (maxDepth is None) or (depth < maxDepth):
+								pendingDirs.append((entry[0], depth))
+						yield entry
+		finally:
+			for future in futures:
+				future.cancel()
+			executor.shutdown(wait=True)
+	#
+
+
+
+	#
+	# Get functions that list the content of a directory in the same way as <c>listDirectoryContent()</c> does. Each
+	# function is used by a single thread at a time. Shares that can not list directories concurrently return a single function.
+	#
+	# @param		int numThreads		The number of threads that want to list directories.
+	# @return		callable[]			Returns a list of at least one function.
+	#
+	def _acquireDirectoryListers(self, numThreads):
+		return [ self.listDirectoryContent ]
+	#
+
+
+
+	#
+	# Release the functions returned by <c>_acquireDirectoryListers()</c>.
+	#
+	def _releaseDirectoryListers(self, listers):
+		pass
 	#
 
 
@@ -9,11 +9,57 @@ import sys
 import datetime
 import shutil
 import stat
+import threading
+import queue
+import contextlib
+import concurrent.futures
 import smbc
 
 import jk_temporary
 
 from .AbstractShare import *
+from .RawFileStream import RawFileStream
+
+
+
+# the values of smbc_type for directory entries
+_SMBC_TYPE_DIR = 7
+_SMBC_TYPE_FILE = 8
+
+# the default number of bytes to read or write with a single request
+_DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+
+
+#
+# Read from an smbc file until the specified number of bytes has been read or the end of the file has been reached.
+#
+def _readFully(f, length):
+	chunks = []
+	n = 0
+	while n < length:
+		data = f.read(length - n)
+		if not data:
+			break
+		chunks.append(data)
+		n += len(data)
+	if len(chunks) == 1:
+		return chunks[0]
+	return b"".join(chunks)
+#
+
+#
+# Write all data to an smbc file.
+#
+def _writeFully(f, data):
+	while data:
+		n = f.write(data)
+		if (n is None) or (n >= len(data)):
+			break
+		if n <= 0:
+			raise Exception("Failed to write data!")
+		data = data[n:]
+#
 
 
 
@@ -30,9 +76,9 @@ class CifsShare(AbstractShare):
 	#									- 8 for files
 	# @param		str comment			The comment describing this share
 	#
-	def __init__(self, parent, ctx, shareName, smbcType, comment):
+	def __init__(self, parent, shareName, smbcType, comment):
 		self.__parent = parent
-		self.__ctx = ctx
+		self.__bOpen = True
 		self.__shareName = shareName
 		if smbcType == 3:
 			self.__isSpecial = False
@@ -42,6 +88,51 @@ class CifsShare(AbstractShare):
 			raise Exception("Invalid type specified!")
 		self.__comment = comment
 		self.__urlBase = "smb://" + self.__parent.hostName + "/" + shareName + "/"
+		self.__blockSize = _DEFAULT_BLOCK_SIZE
+		self.__numParallelRequests = 1
+
+	#
+
+
+
+	#
+	# Set the size of the blocks read or written with a single request during file transfers. Larger blocks reduce the
+	# number of round trips. SMB 2.1 and later servers typically accept up to 1 MiB (often up to 8 MiB) per request.
+	#
+	def setBlockSize(self, blockSize):
+		assert isinstance(blockSize, int)
+		assert blockSize > 0
+		self.__blockSize = blockSize
+
+	#
+
+
+
+	@property
+	def blockSize(self):
+		return self.__blockSize
+
+	#
+
+
+
+	#
+	# Set the number of requests that may be outstanding at the same time while uploading or downloading a single file.
+	# If greater than one, the blocks of a file are distributed over several contexts, each of them having an own handle
+	# for the file. At most <c>numParallelRequests * blockSize</c> bytes are kept in memory.
+	#
+	def setNumParallelRequests(self, numParallelRequests):
+		assert isinstance(numParallelRequests, int)
+		assert numParallelRequests > 0
+		self.__numParallelRequests = numParallelRequests
+
+	#
+
+
+
+	@property
+	def numParallelRequests(self):
+		return self.__numParallelRequests
 
 	#
 
@@ -95,7 +186,7 @@ class CifsShare(AbstractShare):
 
 	@property
 	def isOpen(self):
-		return self.__ctx is not None
+		return self.__bOpen
 
 	#
 
@@ -103,14 +194,14 @@ class CifsShare(AbstractShare):
 
 	@property
 	def isClosed(self):
-		return self.__ctx is None
+		return not self.__bOpen
 
 	#
 
 
 
-	def __close(self):
-		self.__ctx = None
+	def _close(self):
+		self.__bOpen = False
 
 	#
 
@@ -132,11 +223,14 @@ class CifsShare(AbstractShare):
 			raise Exception("Not an absolute path: " + remoteOutputFilePath)
 		# TODO: normalize specified path
 
-		fileSize = os.stat(localInputFilePath).st_size
-
-		with open(localInputFilePath, momde="rb") as fin:
-			with self.__ctx.open(remotePath, os.O_CREAT | os.O_WRONLY) as fout:
-				shutil.copyfileobj(fin, fout, 65536)
+		fdIn = os.open(localInputFilePath, os.O_RDONLY)
+		try:
+			fileSize = os.fstat(fdIn).st_size
+			with self.__parent._leaseContext() as ctx:
+				ctx.open(remotePath, os.O_CREAT | os.O_WRONLY | os.O_TRUNC).close()
+			self.__transferBlocks(remotePath, fdIn, fileSize, True)
+		finally:
+			os.close(fdIn)
 
 		if bRemoveLocalFileAfterUpload:
 			os.unlink(localInputFilePath)
@@ -145,15 +239,168 @@ class CifsShare(AbstractShare):
 
 
 
+	def downloadFile(self, remoteInputFilePath, localOutputFilePath):
+		if remoteInputFilePath.startswith("/"):
+			remotePath = self.__urlBase + remoteInputFilePath[1:]
+		else:
+			raise Exception("Not an absolute path: " + remoteInputFilePath)
+		# TODO: normalize specified path
+
+		with self.__parent._leaseContext() as ctx:
+			(st_mode, st_inode, st_dev, st_nlink, st_uid, st_gid, st_size, st_atime, st_mtime, st_ctime) = ctx.stat(remotePath)
+		if not stat.S_ISREG(st_mode):
+			raise Exception("No such file: " + remoteInputFilePath)
+
+		fdOut = os.open(localOutputFilePath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+		try:
+			self.__transferBlocks(remotePath, fdOut, st_size, False)
+		finally:
+			os.close(fdOut)
+		os.utime(localOutputFilePath, (st_atime, st_mtime))
+
+	#
+
+
+
+	#
+	# Transfer the content of a file block by block between a local file and a file on the share. The remote file must exist.
+	# The blocks are transferred by up to <c>numParallelRequests</c> threads, each of them using a context and a file handle
+	# of its own. Local data is read and written with <c>os.pread()</c> and <c>os.pwrite()</c>, so all threads can share
+	# the same local file descriptor.
+	#
+	# @param		str remotePath			The URL of the remote file
+	# @param		int localFD				The file descriptor of the local file
+	# @param		int fileSize			The number of bytes to transfer
+	# @param		bool bUpload			<c>True</c> to transfer from the local to the remote file, <c>False</c> otherwise
+	#
+	def __transferBlocks(self, remotePath, localFD, fileSize, bUpload):
+		blockSize = self.__blockSize
+		blockOffsets = range(0, fileSize, blockSize)
+		numWorkers = min(self.__numParallelRequests, len(blockOffsets))
+		if numWorkers == 0:
+			return
+
+		def transfer(workerNo):
+			(ctx, fnRelease) = self.__parent._acquireContext()
+			try:
+				f = ctx.open(remotePath, os.O_WRONLY if bUpload else os.O_RDONLY)
+				try:
+					for offset in blockOffsets[workerNo::numWorkers]:
+						length = min(blockSize, fileSize - offset)
+						f.lseek(offset, os.SEEK_SET)
+						if bUpload:
+							data = os.pread(localFD, length, offset)
+							if len(data) != length:
+								raise Exception("Local file has been modified during upload!")
+							_writeFully(f, data)
+						else:
+							data = _readFully(f, length)
+							if len(data) != length:
+								raise Exception("Remote file has been modified during download!")
+							os.pwrite(localFD, data, offset)
+				finally:
+					f.close()
+			finally:
+				fnRelease()
+
+		if numWorkers == 1:
+			transfer(0)
+		else:
+			with concurrent.futures.ThreadPoolExecutor(max_workers=numWorkers) as executor:
+				for future in [ executor.submit(transfer, i) for i in range(0, numWorkers) ]:
+					future.result()
+
+	#
+
+
+
 	def _writeAllDataToFile(self, remoteOutputFilePath, fileData, timeStamp = None):
 		if remoteOutputFilePath.startswith("/"):
 			remotePath = self.__urlBase + remoteOutputFilePath[1:]
 		else:
 			raise Exception("Not an absolute path: " + remoteOutputFilePath)
 		# TODO: normalize specified path
-		f = self.__ctx.open(remotePath, os.O_CREAT | os.O_WRONLY)
-		f.write(fileData)
-		f.close()
+		blockSize = self.__blockSize
+		with self.__parent._leaseContext() as ctx:
+			f = ctx.open(remotePath, os.O_CREAT | os.O_WRONLY | os.O_TRUNC)
+			try:
+				if isinstance(fileData, memoryview) or (len(fileData) > blockSize):
+					# write block by block; smbc expects byte strings
+					fileData = memoryview(fileData)
+					for i in range(0, len(fileData), blockSize):
+						_writeFully(f, bytes(fileData[i:i + blockSize]))
+				else:
+					_writeFully(f, bytes(fileData))
+			finally:
+				f.close()
+
+	#
+
+
+
+	#
+	# Streams use a buffer of at least <c>blockSize</c> bytes, so reading and writing is performed with large requests.
+	#
+	def open(self, path, mode = "rb", bufferSize = 65536):
+		(bReadable, bWritable, bCreate, bTruncate, bAppend) = self._parseOpenMode(mode)
+		bufferSize = max(bufferSize, self.__blockSize)
+		if path.startswith("/"):
+			path2 = self.__urlBase + path[1:]
+		else:
+			raise Exception("Not an absolute path: " + path)
+		# TODO: normalize specified path
+
+		if bReadable and bWritable:
+			flags = os.O_RDWR
+		elif bWritable:
+			flags = os.O_WRONLY
+		else:
+			flags = os.O_RDONLY
+		if bCreate:
+			flags |= os.O_CREAT
+		if bTruncate:
+			flags |= os.O_TRUNC
+		# a stream might be kept open for a long time: use a context of its own
+		(ctx, fnRelease) = self.__parent._acquireContext()
+		try:
+			f = ctx.open(path2, flags)
+			if bAppend:
+				f.lseek(0, os.SEEK_END)
+		except:
+			fnRelease()
+			raise
+
+		def close():
+			try:
+				f.close()
+			finally:
+				fnRelease()
+
+		return self._wrapRawFileStream(
+			RawFileStream(f.read if bReadable else None, f.write if bWritable else None, f.lseek, close),
+			bufferSize)
+
+	#
+
+
+
+	def readRanges(self, path, ranges):
+		ranges = self._verifyRanges(ranges)
+		if path.startswith("/"):
+			path2 = self.__urlBase + path[1:]
+		else:
+			raise Exception("Not an absolute path: " + path)
+		# TODO: normalize specified path
+		ret = []
+		with self.__parent._leaseContext() as ctx:
+			f = ctx.open(path2, os.O_RDONLY)
+			try:
+				for (offset, length) in ranges:
+					f.lseek(offset, os.SEEK_SET)
+					ret.append(_readFully(f, length))
+			finally:
+				f.close()
+		return ret
 
 	#
 
@@ -165,10 +412,19 @@ class CifsShare(AbstractShare):
 		else:
 			raise Exception("Not an absolute path: " + path)
 		# TODO: normalize specified path
-		f = self.__ctx.open(path2, os.O_RDONLY)
-		myData = f.read()
-		f.close()
-		return myData
+		blockSize = self.__blockSize
+		chunks = []
+		with self.__parent._leaseContext() as ctx:
+			f = ctx.open(path2, os.O_RDONLY)
+			try:
+				while True:
+					data = f.read(blockSize)
+					if not data:
+						break
+					chunks.append(data)
+			finally:
+				f.close()
+		return b"".join(chunks)
 
 	#
 
@@ -180,7 +436,8 @@ class CifsShare(AbstractShare):
 		else:
 			raise Exception("Not an absolute path: " + path)
 		# TODO: normalize specified path
-		self.__ctx.rmdir(path2)
+		with self.__parent._leaseContext() as ctx:
+			ctx.rmdir(path2)
 
 	#
 
@@ -195,11 +452,13 @@ class CifsShare(AbstractShare):
 		if bIgnoreErrorIfNotExists:
 			# TODO: fail if target is not a file!
 			try:
-				self.__ctx.unlink(path2)
+				with self.__parent._leaseContext() as ctx:
+					ctx.unlink(path2)
 			except:
 				return False
 		else:
-			self.__ctx.unlink(path2)
+			with self.__parent._leaseContext() as ctx:
+				ctx.unlink(path2)
 		return True
 	#
 
@@ -211,44 +470,83 @@ class CifsShare(AbstractShare):
 		else:
 			raise Exception("Not an absolute path: " + path)
 		# TODO: normalize specified path
-		self.__ctx.mkdir(path2)
+		with self.__parent._leaseContext() as ctx:
+			ctx.mkdir(path2)
 
 	#
 
 
 
+	def stat(self, path):
+		if path.startswith("/"):
+			path2 = self.__urlBase + path[1:]
+		else:
+			raise Exception("Not an absolute path: " + path)
+		# TODO: normalize specified path
+		if path2.endswith("/"):
+			path2 = path2[:-1]
+		try:
+			with self.__parent._leaseContext() as ctx:
+				(st_mode, st_inode, st_dev, st_nlink, st_uid, st_gid, st_size, st_atime, st_mtime, st_ctime) = ctx.stat(path2)
+		except smbc.NoEntryError:
+			return None
+		return self._buildStatTuple(path2[path2.rfind("/") + 1:], st_mode, st_uid, st_gid, st_size, st_mtime)
+
 	#
-	# Returns the contents of the specified directory. Only the file names are returned.
+
+
+
 	#
-	# @return		string[]		Returns an array of strings containing the names of the directory entries.
+	# Read the entries of a directory. The type of each entry is determined by the <c>smbc_type</c> provided by the server
+	# with each entry, so no additional requests are required.
 	#
+	# @return		tuple			Returns the URL of the directory (with a trailing slash) and a list of tuples containing the entry
+	#								names and a single character 'f', 'd' or '?' indicating the type of each entry.
 	#
-	def listDirectoryContentNames(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
+	def __readDirectory(self, path):
 		if path.startswith("/"):
 			path2 = self.__urlBase + path[1:]
 		else:
 			raise Exception("Not an absolute path: " + path)
-		if path2.endswith("/"):
-			path2 = path2[:-1]
+		if not path2.endswith("/"):
+			path2 += "/"
 		ret = []
-		d = self.__ctx.opendir(path2)
-		entries = d.getdents()
-		for entry in entries:
-			if (entry.name == ".") or  (entry.name == ".."):
+		with self.__parent._leaseContext() as ctx:
+			dirEntries = ctx.opendir(path2[:-1]).getdents()
+		for entry in dirEntries:
+			if (entry.name == ".") or (entry.name == ".."):
 				continue
-			if bIncludeSubDirs and bIncludeFiles:
-				ret.append(entry.name)
+			if entry.smbc_type == _SMBC_TYPE_DIR:
+				ret.append((entry.name, 'd'))
+			elif entry.smbc_type == _SMBC_TYPE_FILE:
+				ret.append((entry.name, 'f'))
 			else:
-				(st_mode, st_inode, st_dev, st_nlink, st_uid, st_gid, st_size, st_atime, st_mtime, st_ctime) = self.__ctx.stat(path + "/" + entry.name)
-				if stat.S_ISDIR(st_mode): #entry.smbc_type == 7:
-					if bIncludeSubDirs:
-						ret.append(entry.name)
-				elif stat.S_ISREG(st_mode): #entry.smbc_type == 8:
-					if bIncludeFiles:
-						ret.append(entry.name)
-				else:
-					raise Exception("Unexpected type ID found for entry '" + entry.name + "': " + str(entry.smbc_type))
+				ret.append((entry.name, '?'))
+		return (path2, ret)
+
+	#
+
 
+
+	#
+	# Returns the contents of the specified directory. Only the file names are returned. This method is significantly faster
+	# than <c>listDirectoryContent()</c> as no additional data needs to be retrieved for each directory entry.
+	#
+	# @return		string[]		Returns an array of strings containing the names of the directory entries.
+	#
+	#
+	def listDirectoryContentNames(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
+		(dirURL, entries) = self.__readDirectory(path)
+		ret = []
+		for (name, entryType) in entries:
+			if entryType == 'd':
+				if bIncludeSubDirs:
+					ret.append(name)
+			elif entryType == 'f':
+				if bIncludeFiles:
+					ret.append(name)
+			elif bIncludeOthers:
+				ret.append(name)
 		return ret
 
 	#
@@ -258,6 +556,10 @@ class CifsShare(AbstractShare):
 	#
 	# Returns the contents of the specified directory.
 	#
+	# Attributes are retrieved only for the entries selected. (<c>libsmbclient</c> provides <c>smbc_readdirplus()</c> for reading
+	# directory entries together with their attributes, but <c>pysmbc</c> does not expose it, so a stat request per entry is
+	# still required here.)
+	#
 	# @return		tuple[]		Returns an array of tuples containing data about the directory entries. Each tuple contains the following data:
 	#							* string: The file or directory Name
 	#							* string: A single character named 'f' or 'd' indicating file or directory
@@ -268,33 +570,73 @@ class CifsShare(AbstractShare):
 	#							* int: The modification time stamp in milliseconds (!) since Epoch or <c>None</c> if a directory
 	#
 	def listDirectoryContent(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
-		if path.startswith("/"):
-			path2 = self.__urlBase + path[1:]
-		else:
-			raise Exception("Not an absolute path: " + path)
-		if path2.endswith("/"):
-			path2 = path2[:-1]
-		ret = []
-		d = self.__ctx.opendir(path2)
-		entries = d.getdents()
-		for entry in entries:
-			if (entry.name == ".") or  (entry.name == ".."):
+		(dirURL, entries) = self.__readDirectory(path)
+		names = []
+		for (name, entryType) in entries:
+			if entryType == 'd':
+				if not bIncludeSubDirs:
+					continue
+			elif entryType == 'f':
+				if not bIncludeFiles:
+					continue
+			elif not bIncludeOthers:
 				continue
-			(st_mode, st_inode, st_dev, st_nlink, st_uid, st_gid, st_size, st_atime, st_mtime, st_ctime) = self.__ctx.stat(path + "/" + entry.name)
-			if stat.S_ISDIR(st_mode): #entry.smbc_type == 7:
-				if bIncludeSubDirs:
-					ret.append((entry.name, 'd', st_mode, st_uid, st_gid, None, None))
-			elif stat.S_ISREG(st_mode): #entry.smbc_type == 8:
-				if bIncludeFiles:
-					ret.append((entry.name, 'f', st_mode, st_uid, st_gid, st_size, st_mtime * 1000))
-			else:
-				raise Exception("Unexpected type ID found for entry '" + entry.name + "': " + str(entry.smbc_type))
+			names.append(name)
+
+		ret = []
+		for (name, statResult) in zip(names, self.__statMany([ dirURL + name for name in names ])):
+			(st_mode, st_inode, st_dev, st_nlink, st_uid, st_gid, st_size, st_atime, st_mtime, st_ctime) = statResult
+			ret.append(self._buildStatTuple(name, st_mode, st_uid, st_gid, st_size, st_mtime))
 		return ret
 
 	#
 
 
 
+	#
+	# Stat many files or directories. If the client provides multiple contexts the requests are distributed over all of them.
+	#
+	# @param		str[] urls			The URLs of the files or directories
+	# @return		tuple[]				The results of <c>stat()</c> in the same order
+	#
+	def __statMany(self, urls):
+		numContexts = min(self.__parent.numContexts, len(urls))
+		if numContexts <= 1:
+			with self.__parent._leaseContext() as ctx:
+				return [ ctx.stat(url) for url in urls ]
+
+		def statSlice(urlSlice):
+			with self.__parent._leaseContext() as ctx:
+				return [ ctx.stat(url) for url in urlSlice ]
+
+		with concurrent.futures.ThreadPoolExecutor(max_workers=numContexts) as executor:
+			ret = []
+			for statResults in executor.map(statSlice, [ urls[i::numContexts] for i in range(0, numContexts) ]):
+				ret.append(statResults)
+		# undo the interleaving of the slices
+		return [ ret[i % numContexts][i // numContexts] for i in range(0, len(urls)) ]
+
+	#
+
+
+
+	#
+	# Operations are performed in parallel on all contexts provided by the client.
+	#
+	def _getBatchConcurrency(self):
+		return self.__parent.numContexts
+
+	#
+
+
+
+	def _acquireDirectoryListers(self, numThreads):
+		return [ self.listDirectoryContent ] * min(numThreads, self.__parent.numContexts)
+
+	#
+
+
+
 	def _createRandomFilePath(self, dirPath, prefix = 'tmp_', randomNameLength = 32, postfix = ''):
 		return jk_temporary.createRandomFilePath(dirPath, randomNameLength = 64, postfix = '')
 
@@ -309,16 +651,35 @@ class CifsShare(AbstractShare):
 
 class CifsClient(object):
 
-	def __init__(self, serverIPAddress, userName, password, workgroup = None):
+	#
+	# @param		str serverIPAddress			The server to connect to
+	# @param		int numContexts				(optional) The number of SMB contexts (and therefore sessions) to use. Operations invoked
+	#											from different threads are performed in parallel on different contexts.
+	# @param		int shareTableTTL			(optional) The number of seconds the list of shares of the server is cached.
+	#
+	def __init__(self, serverIPAddress, userName, password, workgroup = None, numContexts = 1, shareTableTTL = 60):
+		assert isinstance(numContexts, int)
+		assert numContexts > 0
+		assert isinstance(shareTableTTL, (int, float))
+		assert shareTableTTL >= 0
+
 		self.__serverIPAddress = serverIPAddress
 		self.__userName = userName
 		self.__password = password
 		self.__workgroup = workgroup
 
-		self.__ctx = smbc.Context()
-		self.__ctx.optionNoAutoAnonymousLogin = True
-		cb = lambda server, shar, workgroup, user, pwd: (self.__workgroup if self.__workgroup != None else workgroup, self.__userName, self.__password)
-		self.__ctx.functionAuthData = cb
+		self.__lock = threading.Lock()
+
+		# all contexts are kept in a pool; an operation checks out a context for its duration
+		self.__numContexts = numContexts
+		self.__freeContexts = queue.Queue()
+		for i in range(0, numContexts):
+			self.__freeContexts.put(self.__createContext())
+		self.__spareContexts = []
+
+		self.__shareTableTTL = shareTableTTL
+		self.__shareTable = None
+		self.__shareTableTimeStamp = None
 
 		self.__openShares = {}
 		self.__urlBase = "smb://" + serverIPAddress + "/"
@@ -327,6 +688,62 @@ class CifsClient(object):
 
 
 
+	def __createContext(self):
+		ctx = smbc.Context()
+		ctx.optionNoAutoAnonymousLogin = True
+		cb = lambda server, shar, workgroup, user, pwd: (self.__workgroup if self.__workgroup != None else workgroup, self.__userName, self.__password)
+		ctx.functionAuthData = cb
+		return ctx
+
+	#
+
+
+
+	#
+	# Check out a context from the pool. If all contexts are in use this method waits until a context is returned.
+	#
+	@contextlib.contextmanager
+	def _leaseContext(self):
+		freeContexts = self.__freeContexts
+		if freeContexts is None:
+			raise Exception("Connection already closed.")
+		ctx = freeContexts.get()
+		try:
+			yield ctx
+		finally:
+			freeContexts.put(ctx)
+
+	#
+
+
+
+	#
+	# Get a context for use over a longer period of time, f.e. for an open stream. These contexts are separate from the pooled
+	# ones so that they never block other operations. They are created on demand and reused after they have been released.
+	#
+	# @return		tuple			Returns the context and a function that must be invoked to release it.
+	#
+	def _acquireContext(self):
+		if self.__freeContexts is None:
+			raise Exception("Connection already closed.")
+		with self.__lock:
+			if self.__spareContexts:
+				ctx = self.__spareContexts.pop()
+			else:
+				ctx = None
+		if ctx is None:
+			ctx = self.__createContext()
+
+		def release():
+			with self.__lock:
+				self.__spareContexts.append(ctx)
+
+		return (ctx, release)
+
+	#
+
+
+
 	#
 	# Get an URL representation of this share. This includes the type, a server and a path.
 	# This method will not return more specific information as f.e. authentification data.
@@ -356,9 +773,20 @@ class CifsClient(object):
 
 
 
+	#
+	# The number of SMB contexts available for performing operations in parallel.
+	#
+	@property
+	def numContexts(self):
+		return self.__numContexts
+
+	#
+
+
+
 	@property
 	def isOpen(self):
-		return self.__ctx is not None
+		return self.__freeContexts is not None
 
 	#
 
@@ -366,7 +794,26 @@ class CifsClient(object):
 
 	@property
 	def isClosed(self):
-		return self.__ctx is None
+		return self.__freeContexts is None
+
+	#
+
+
+
+	#
+	# Get the shares of the server. The list of shares is retrieved from the server only if it has not been retrieved
+	# within the last <c>shareTableTTL</c> seconds.
+	#
+	# @return		dict			A dictionary mapping share names to directory entries
+	#
+	def __getShareTable(self):
+		with self.__lock:
+			if (self.__shareTable is None) or (time.monotonic() - self.__shareTableTimeStamp >= self.__shareTableTTL):
+				with self._leaseContext() as ctx:
+					entries = ctx.opendir("smb://" + self.__serverIPAddress + "/").getdents()
+				self.__shareTable = { entry.name: entry for entry in entries }
+				self.__shareTableTimeStamp = time.monotonic()
+			return self.__shareTable
 
 	#
 
@@ -376,25 +823,14 @@ class CifsClient(object):
 	# Get a list of Samba Shares
 	#
 	def listShareNames(self):
-		ret = []
-		dir = self.__ctx.opendir("smb://" + self.__serverIPAddress + "/")
-		entries = dir.getdents()
-		for entry in entries:
-			ret.append(entry.name)
-		return ret
+		return list(self.__getShareTable().keys())
 
 	#
 
 
 
 	def __getShareObject(self, shareName):
-		dir = self.__ctx.opendir("smb://" + self.__serverIPAddress + "/")
-		entries = dir.getdents()
-		for entry in entries:
-			if shareName == entry.name:
-				return entry
-		return None
-		#raise Exception("No such share: " + shareName)
+		return self.__getShareTable().get(shareName)
 
 	#
 
@@ -404,26 +840,32 @@ class CifsClient(object):
 	# Return an an object representing a share.
 	#
 	def openShare(self, shareName):
-		if self.__ctx is None:
+		if self.__freeContexts is None:
 			raise Exception("Connection already closed.")
-		if shareName in self.__openShares:
-			return self.__openShares[shareName]
+		with self.__lock:
+			if shareName in self.__openShares:
+				return self.__openShares[shareName]
 		shareObj = self.__getShareObject(shareName)
 		if shareObj is None:
 			raise Exception("No such share: " + shareName)
-		else:
-			cs = CifsShare(self, self.__ctx, shareName, shareObj.smbc_type, shareObj.comment)
-			self.__openShares[shareName] = cs
+		with self.__lock:
+			cs = self.__openShares.get(shareName)
+			if cs is None:
+				cs = CifsShare(self, shareName, shareObj.smbc_type, shareObj.comment)
+				self.__openShares[shareName] = cs
 			return cs
 	#
 
 
 
 	def close(self):
-		self.__ctx = None
-		for cifsShare in self.__openShares.values():
-			cifsShare.__close()
-		self.__openShares = {}
+		self.__freeContexts = None
+		with self.__lock:
+			for cifsShare in self.__openShares.values():
+				cifsShare._close()
+			self.__openShares = {}
+			self.__shareTable = None
+			self.__spareContexts = []
 
 	#
 
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+from datetime import datetime
+
+
+
+
+#
+# Instances of this class represent a directory within a file set. Each node knows about the files directly contained
+# and about the files within the whole subtree: The number of files, their total size and the newest modification time
+# stamp. These values are calculated once when the tree is built, so querying them does not require to touch the file list.
+#
+class DirectoryTreeNode(object):
+
+	def __init__(self, parent, name):
+		self.__parent = parent
+		self.__name = name
+		if parent is None:
+			self.__relPath = ""
+		elif parent.__parent is None:
+			self.__relPath = name
+		else:
+			self.__relPath = parent.__relPath + "/" + name
+		self.__children = {}
+		self.__fileCount = 0
+		self.__fileSize = 0
+		self.__newestTimeStampNS = None
+		self.__totalFileCount = 0
+		self.__totalSize = 0
+		self.__totalNewestTimeStampNS = None
+
+	#
+
+
+
+	#
+	# Build a directory tree.
+	#
+	# @param		iterable<tuple> dirData		Tuples containing the relative directory path, the number of files, the total size
+	#											of these files and the newest time stamp (in nanoseconds since epoch) of the files
+	#											directly contained in that directory. The root directory has the path "".
+	# @return		DirectoryTreeNode			Returns the root node.
+	#
+	@staticmethod
+	def buildTree(dirData):
+		root = DirectoryTreeNode(None, "")
+		nodesByPath = { "": root }
+		for (relDirPath, fileCount, fileSize, newestTimeStampNS) in dirData:
+			node = root.__getOrCreateNode(nodesByPath, relDirPath)
+			node.__fileCount += fileCount
+			node.__fileSize += fileSize
+			if (newestTimeStampNS != None) and ((node.__newestTimeStampNS is None) or (newestTimeStampNS > node.__newestTimeStampNS)):
+				node.__newestTimeStampNS = newestTimeStampNS
+
+		# aggregate bottom up: children first
+		for node in sorted(nodesByPath.values(), key=lambda n: n.__relPath.count("/") + (1 if n.__relPath else 0), reverse=True):
+			node.__totalFileCount += node.__fileCount
+			node.__totalSize += node.__fileSize
+			node.__totalNewestTimeStampNS = DirectoryTreeNode.__max(node.__totalNewestTimeStampNS, node.__newestTimeStampNS)
+			parent = node.__parent
+			if parent != None:
+				parent.__totalFileCount += node.__totalFileCount
+				parent.__totalSize += node.__totalSize
+				parent.__totalNewestTimeStampNS = DirectoryTreeNode.__max(parent.__totalNewestTimeStampNS, node.__totalNewestTimeStampNS)
+
+		return root
+
+	#
+
+
+
+	@staticmethod
+	def __max(a, b):
+		if a is None:
+			return b
+		if b is None:
+			return a
+		return a if a > b else b
+
+	#
+
+
+
+	def __getOrCreateNode(self, nodesByPath, relDirPath):
+		node = nodesByPath.get(relDirPath)
+		if node is None:
+			n = relDirPath.rfind("/")
+			if n > 0:
+				parent = self.__getOrCreateNode(nodesByPath, relDirPath[0:n])
+				name = relDirPath[n + 1:]
+			else:
+				parent = self
+				name = relDirPath
+			node = DirectoryTreeNode(parent, name)
+			parent.__children[name] = node
+			nodesByPath[relDirPath] = node
+		return node
+
+	#
+
+
+
+	@property
+	def name(self):
+		return self.__name
+
+	#
+
+
+
+	#
+	# The path of this directory relative to the root of the file set. The root directory has the path "".
+	#
+	@property
+	def relPath(self):
+		return self.__relPath
+
+	#
+
+
+
+	@property
+	def parent(self):
+		return self.__parent
+
+	#
+
+
+
+	#
+	# The names of all subdirectories in alphabetical order.
+	#
+	@property
+	def childNames(self):
+		return sorted(self.__children.keys())
+
+	#
+
+
+
+	#
+	# All subdirectories in alphabetical order.
+	#
+	@property
+	def children(self):
+		return [ self.__children[name] for name in sorted(self.__children.keys()) ]
+
+	#
+
+
+
+	def getChild(self, name):
+		return self.__children.get(name)
+
+	#
+
+
+
+	#
+	# Get the node of a directory within the subtree of this directory.
+	#
+	# @param		str relDirPath			The path of the directory relative to this directory.
+	# @return		DirectoryTreeNode		Returns the node or <c>None</c> if there is no such directory.
+	#
+	def getNode(self, relDirPath):
+		node = self
+		for name in relDirPath.split("/"):
+			if name:
+				node = node.__children.get(name)
+				if node is None:
+					return None
+		return node
+
+	#
+
+
+
+	#
+	# The number of files directly contained in this directory.
+	#
+	@property
+	def fileCount(self):
+		return self.__fileCount
+
+	#
+
+
+
+	#
+	# The total size of the files directly contained in this directory.
+	#
+	@property
+	def fileSize(self):
+		return self.__fileSize
+
+	#
+
+
+
+	#
+	# The number of files in this directory and all subdirectories.
+	#
+	@property
+	def totalFileCount(self):
+		return self.__totalFileCount
+
+	#
+
+
+
+	#
+	# The total size of all files in this directory and all subdirectories.
+	#
+	@property
+	def totalSize(self):
+		return self.__totalSize
+
+	#
+
+
+
+	#
+	# The newest modification time stamp of all files in this directory and all subdirectories in nanoseconds since epoch
+	# or <c>None</c> if there are no files.
+	#
+	@property
+	def newestTimeStampNS(self):
+		return self.__totalNewestTimeStampNS
+
+	#
+
+
+
+	#
+	# The newest modification time stamp of all files in this directory and all subdirectories as <c>datetime</c> object
+	# or <c>None</c> if there are no files.
+	#
+	@property
+	def newestTimeStamp(self):
+		if self.__totalNewestTimeStampNS is None:
+			return None
+		return datetime.utcfromtimestamp(self.__totalNewestTimeStampNS / 1000000000)
+
+	#
+
+
+
+	#
+	# Iterate over this directory and all directories below in depth first order.
+	#
+	def iterateRecursively(self):
+		yield self
+		for child in self.children:
+			yield from child.iterateRecursively()
+
+	#
+
+
+
+#
+
+
+
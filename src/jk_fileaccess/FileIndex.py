@@ -0,0 +1,820 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import os
+import sys
+import gzip
+import mmap
+import struct
+import hashlib
+import collections
+import multiprocessing
+from array import array
+from datetime import datetime
+
+from .PrefixFilePathFilter import PrefixFilePathFilter
+from .AndFilePathFilter import AndFilePathFilter
+from .DirectoryTreeNode import DirectoryTreeNode
+
+
+
+
+__chunkParserFilePathFilter = None
+
+def _initIndexChunkParser(filePathFilter):
+	global __chunkParserFilePathFilter
+	__chunkParserFilePathFilter = filePathFilter
+
+#
+# Parse a chunk of an index file. This function is invoked in a worker process.
+#
+# @param		bytes data			A chunk of the decompressed index file. This chunk consists of complete lines only.
+# @return		tuple				Returns a tuple containing a directory table local to this chunk, the directory IDs
+#									of the files (as bytes of an <c>array('i')</c>), the file names, the file sizes and
+#									time stamps (as bytes of an <c>array('q')</c>), the number of lines and the
+#									number of lines with a path starting with "./".
+#
+def _parseIndexChunk(data):
+	filePathFilter = __chunkParserFilePathFilter
+	dirPaths = [ "" ]
+	dirIDsByPath = { "": 0 }
+	fileDirIDs = array('i')
+	fileNames = []
+	fileSizes = array('q')
+	fileTimeStamps = array('q')
+	nCountLines = 0
+	nCountDotSlash = 0
+
+	rawPaths = []
+	for line in data.decode("utf-8").split("\n"):
+		if not line:
+			continue
+		(sSize, sTimeStamp, sRelPath) = line.split('\t')
+		rawPaths.append(sRelPath)
+		fileSizes.append(int(sSize))
+		fileTimeStamps.append(FileIndex.parseTimeStampNS(sTimeStamp))
+	nCountLines = len(rawPaths)
+
+	if filePathFilter != None:
+		# filter all lines of this chunk at once
+		accepted = filePathFilter.acceptMany(rawPaths, fileSizes, fileTimeStamps)
+		rawPaths = [ p for (p, b) in zip(rawPaths, accepted) if b ]
+		fileSizes = array('q', [ v for (v, b) in zip(fileSizes, accepted) if b ])
+		fileTimeStamps = array('q', [ v for (v, b) in zip(fileTimeStamps, accepted) if b ])
+
+	for sRelPath in rawPaths:
+		if sRelPath.startswith("./"):
+			sRelPath = sRelPath[2:]
+			nCountDotSlash += 1
+		n = sRelPath.rfind('/')
+		if n > 0:
+			dirPath = sRelPath[0:n]
+			dirID = dirIDsByPath.get(dirPath)
+			if dirID is None:
+				dirID = len(dirPaths)
+				dirIDsByPath[dirPath] = dirID
+				dirPaths.append(dirPath)
+			fileDirIDs.append(dirID)
+			fileNames.append(sRelPath[n + 1:])
+		else:
+			fileDirIDs.append(0)
+			fileNames.append(sRelPath)
+
+	return (dirPaths, fileDirIDs.tobytes(), fileNames, fileSizes.tobytes(), fileTimeStamps.tobytes(), nCountLines, nCountDotSlash)
+
+#
+
+
+
+
+#
+# Instances of this class hold the data of a file index in a compact, columnar form.
+#
+# Sizes and time stamps are stored in typed arrays. Time stamps are stored in nanoseconds since
+# epoch and are converted to <c>datetime</c> objects only if accessed. File paths are split into
+# a directory part and a file name part: Every directory path is stored only once in a directory
+# table, each file refers to its directory by ID.
+#
+# Rows are addressed by their position in the index, starting at zero.
+#
+class FileIndex(object):
+
+	__CACHE_MAGIC = b"JKFIDX01" + (b"L" if sys.byteorder == "little" else b"B")
+	__CACHE_HEADER = "<IBQQQQ"
+	__PARSER_CHUNK_SIZE = 4 * 1024 * 1024
+
+	def __init__(self):
+		self.__dirPaths = [ "" ]					# the directory table; ID zero is the root directory
+		self.__dirIDsByPath = { "": 0 }
+		self.__rowsByFileName = None				# for each directory: a dictionary mapping file names to rows; built on demand
+		self.__fileDirIDs = array('i')
+		self.__fileNames = []
+		self.__fileSizes = array('q')
+		self.__fileTimeStamps = array('q')			# nanoseconds since epoch
+		self.__pathPrefix = ""						# the prefix all paths had in the index file ("./" or ""); None if mixed
+		self.__sortedRows = None					# all rows ordered by file path; built on demand
+		self.__directoryTree = None					# built on demand
+
+	#
+
+
+
+	#
+	# Convert a time stamp string as written by <c>find -printf "%T@"</c> to nanoseconds since epoch.
+	# This conversion is performed without any loss of precision.
+	#
+	# @param		str sTimeStamp			The time stamp in seconds since epoch, possibly with fractional digits
+	# @return		int						Returns the number of nanoseconds since epoch.
+	#
+	@staticmethod
+	def parseTimeStampNS(sTimeStamp):
+		n = sTimeStamp.find(".")
+		if n < 0:
+			return int(sTimeStamp) * 1000000000
+		sFrac = sTimeStamp[n + 1:]
+		if len(sFrac) < 9:
+			sFrac += "000000000"[len(sFrac):]
+		t = int(sTimeStamp[:n] or "0") * 1000000000
+		if sTimeStamp.startswith("-"):
+			return t - int(sFrac[:9])
+		else:
+			return t + int(sFrac[:9])
+
+	#
+
+
+
+	#
+	# Convert a time stamp in nanoseconds since epoch to a <c>datetime</c> object.
+	#
+	@staticmethod
+	def timeStampNSToDateTime(timeStampNS):
+		return datetime.utcfromtimestamp(timeStampNS / 1000000000)
+
+	#
+
+
+
+	#
+	# Load a file index. This is a gzip compressed text file containing information about each file line by line.
+	# Each line consists of the file size, the modification time stamp and the relative file path separated by tab characters.
+	#
+	# If more than one process is specified, the decompressed index is split into chunks that are parsed by a pool of
+	# worker processes. The results are merged in the order of the chunks. A file path filter specified must then be
+	# picklable.
+	#
+	# @param		str indexFilePath							The path of the index file to load
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. (optional)
+	# @param		int numProcesses							(optional) The number of processes to parse the index with.
+	# @return		FileIndex									Returns the index object.
+	#
+	@staticmethod
+	def loadFromIndexFile(indexFilePath, filePathFilter = None, numProcesses = 1):
+		if numProcesses > 1:
+			return FileIndex.__loadFromIndexFileParallel(indexFilePath, filePathFilter, numProcesses)
+
+		ret = FileIndex()
+		nCountLines = 0
+		nCountDotSlash = 0
+		with gzip.open(indexFilePath, mode='rt', encoding='utf-8') as fin:
+			for line in fin:
+				nCountLines += 1
+				line = line.strip('\n')
+				(sSize, sTimeStamp, sRelPath) = line.split('\t')
+				fileSize = int(sSize)
+				timeStampNS = FileIndex.parseTimeStampNS(sTimeStamp)
+				if (filePathFilter is None) or filePathFilter.canAcceptFile(sRelPath, fileSize, timeStampNS):
+					if sRelPath.startswith("./"):
+						sRelPath = sRelPath[2:]
+						nCountDotSlash += 1
+					ret.addFile(sRelPath, fileSize, timeStampNS)
+		ret.__setPathPrefix(filePathFilter, nCountLines, nCountDotSlash)
+		return ret
+
+	#
+
+
+
+	@staticmethod
+	def __loadFromIndexFileParallel(indexFilePath, filePathFilter, numProcesses):
+		ret = FileIndex()
+		nCountLines = 0
+		nCountDotSlash = 0
+
+		def mergeChunk(chunkResult):
+			nonlocal nCountLines, nCountDotSlash
+			(dirPaths, dirIDData, fileNames, fileSizeData, fileTimeStampData, nChunkLines, nChunkDotSlash) = chunkResult
+			dirIDMap = [ ret.__getOrCreateDirID(dirPath) for dirPath in dirPaths ]
+			chunkDirIDs = array('i')
+			chunkDirIDs.frombytes(dirIDData)
+			ret.__fileDirIDs.extend([ dirIDMap[dirID] for dirID in chunkDirIDs ])
+			ret.__fileNames.extend(fileNames)
+			ret.__fileSizes.frombytes(fileSizeData)
+			ret.__fileTimeStamps.frombytes(fileTimeStampData)
+			nCountLines += nChunkLines
+			nCountDotSlash += nChunkDotSlash
+
+		# only a limited number of chunks is in flight at the same time to keep memory consumption bounded
+		with multiprocessing.Pool(numProcesses, _initIndexChunkParser, (filePathFilter,)) as pool:
+			pending = collections.deque()
+			with gzip.open(indexFilePath, mode='rb') as fin:
+				remainder = b""
+				while True:
+					data = fin.read(FileIndex.__PARSER_CHUNK_SIZE)
+					if not data:
+						break
+					n = data.rfind(b"\n")
+					if n < 0:
+						remainder += data
+						continue
+					pending.append(pool.apply_async(_parseIndexChunk, (remainder + data[:n + 1],)))
+					remainder = data[n + 1:]
+					if len(pending) >= numProcesses * 2:
+						mergeChunk(pending.popleft().get())
+				if remainder:
+					pending.append(pool.apply_async(_parseIndexChunk, (remainder,)))
+			while pending:
+				mergeChunk(pending.popleft().get())
+
+		ret.__setPathPrefix(filePathFilter, nCountLines, nCountDotSlash)
+		return ret
+
+	#
+
+
+
+	def __setPathPrefix(self, filePathFilter, nCountLines, nCountDotSlash):
+		if filePathFilter is None:
+			if nCountDotSlash == 0:
+				self.__pathPrefix = ""
+			elif nCountDotSlash == nCountLines:
+				self.__pathPrefix = "./"
+			else:
+				self.__pathPrefix = None
+		else:
+			# we can't tell about rejected lines
+			self.__pathPrefix = None
+
+	#
+
+
+
+	#
+	# Load a file index, using a binary cache file if possible. If the cache file does not exist or has been created
+	# for a different version of the index file, the index file is parsed and the cache file is (re)created.
+	#
+	# The cache file always contains the unfiltered index. If a filter is specified it is applied after loading.
+	#
+	# @param		str cacheDirPath							The directory to store cache files in
+	# @param		str sourceID								A string identifying the index file, f.e. an URL
+	# @param		int sourceSize								The size of the index file in bytes
+	# @param		int sourceTimeStamp							The modification time stamp of the index file (in any resolution)
+	# @param		callable fnGetIndexFilePath					A function that returns the path of a local copy of the index file.
+	#															This function will only be invoked if the index file needs to be parsed.
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. (optional)
+	# @param		int numProcesses							(optional) The number of processes to parse the index with.
+	# @return		FileIndex									Returns the index object.
+	#
+	@staticmethod
+	def loadCached(cacheDirPath, sourceID, sourceSize, sourceTimeStamp, fnGetIndexFilePath, filePathFilter = None, numProcesses = 1):
+		cacheFilePath = os.path.join(cacheDirPath, hashlib.sha1(sourceID.encode("utf-8")).hexdigest() + ".fileindex")
+		cacheKey = sourceID + "\t" + str(sourceSize) + "\t" + str(sourceTimeStamp)
+
+		ret = FileIndex.loadFromCacheFile(cacheFilePath, cacheKey)
+		if ret is None:
+			ret = FileIndex.loadFromIndexFile(fnGetIndexFilePath(), None, numProcesses)
+			ret.saveToCacheFile(cacheFilePath, cacheKey)
+
+		if filePathFilter is not None:
+			if ret.__pathPrefix is None:
+				# the paths filters have been applied to in the past can't be reconstructed
+				return FileIndex.loadFromIndexFile(fnGetIndexFilePath(), filePathFilter, numProcesses)
+			ret = ret.filter(filePathFilter)
+
+		return ret
+
+	#
+
+
+
+	#
+	# Write this index to a binary cache file. The file is replaced atomically.
+	#
+	# @param		str cacheFilePath			The path of the cache file to write
+	# @param		str cacheKey				A key identifying the version of the index file this index has been loaded from
+	#
+	def saveToCacheFile(self, cacheFilePath, cacheKey):
+		bKey = cacheKey.encode("utf-8")
+		bDirPaths = "\n".join(self.__dirPaths).encode("utf-8")
+		bFileNames = "\n".join(self.__fileNames).encode("utf-8")
+		pathPrefix = { "": 0, "./": 1, None: 2 }[self.__pathPrefix]
+
+		tmpFilePath = cacheFilePath + "." + str(os.getpid()) + ".tmp"
+		with open(tmpFilePath, "wb") as fout:
+			fout.write(FileIndex.__CACHE_MAGIC)
+			fout.write(struct.pack(FileIndex.__CACHE_HEADER,
+				len(bKey), pathPrefix, len(self.__fileNames), len(self.__dirPaths), len(bDirPaths), len(bFileNames)))
+			fout.write(bKey)
+			self.__fileDirIDs.tofile(fout)
+			self.__fileSizes.tofile(fout)
+			self.__fileTimeStamps.tofile(fout)
+			fout.write(bDirPaths)
+			fout.write(bFileNames)
+		os.replace(tmpFilePath, cacheFilePath)
+
+	#
+
+
+
+	#
+	# Load an index from a binary cache file.
+	#
+	# @param		str cacheFilePath			The path of the cache file to read
+	# @param		str cacheKey				A key identifying the version of the index file required
+	# @return		FileIndex					Returns the index object or <c>None</c> if the cache file does not exist
+	#											or does not match the key specified.
+	#
+	@staticmethod
+	def loadFromCacheFile(cacheFilePath, cacheKey):
+		try:
+			fin = open(cacheFilePath, "rb")
+		except FileNotFoundError:
+			return None
+
+		with fin:
+			if os.fstat(fin.fileno()).st_size < len(FileIndex.__CACHE_MAGIC) + struct.calcsize(FileIndex.__CACHE_HEADER):
+				return None
+			with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+				with memoryview(mm) as mv:
+					return FileIndex.__loadFromCacheData(mv, cacheKey)
+
+	#
+
+
+
+	@staticmethod
+	def __loadFromCacheData(mv, cacheKey):
+		pos = len(FileIndex.__CACHE_MAGIC)
+		if mv[0:pos] != FileIndex.__CACHE_MAGIC:
+			return None
+		(nKeyLength, pathPrefix, nFiles, nDirs, nDirPathsLength, nFileNamesLength) = struct.unpack_from(FileIndex.__CACHE_HEADER, mv, pos)
+		pos += struct.calcsize(FileIndex.__CACHE_HEADER)
+		if bytes(mv[pos:pos + nKeyLength]) != cacheKey.encode("utf-8"):
+			return None
+		pos += nKeyLength
+		if len(mv) != pos + nFiles * 20 + nDirPathsLength + nFileNamesLength:
+			return None
+
+		ret = FileIndex()
+		ret.__pathPrefix = ( "", "./", None )[pathPrefix]
+		ret.__fileDirIDs.frombytes(mv[pos:pos + nFiles * 4])
+		pos += nFiles * 4
+		ret.__fileSizes.frombytes(mv[pos:pos + nFiles * 8])
+		pos += nFiles * 8
+		ret.__fileTimeStamps.frombytes(mv[pos:pos + nFiles * 8])
+		pos += nFiles * 8
+		ret.__dirPaths = str(mv[pos:pos + nDirPathsLength], "utf-8").split("\n")
+		pos += nDirPathsLength
+		ret.__dirIDsByPath = { dirPath: dirID for (dirID, dirPath) in enumerate(ret.__dirPaths) }
+		if nFiles > 0:
+			ret.__fileNames = str(mv[pos:pos + nFileNamesLength], "utf-8").split("\n")
+		if (len(ret.__dirPaths) != nDirs) or (len(ret.__fileNames) != nFiles):
+			return None
+		return ret
+
+	#
+
+
+
+	#
+	# Create a new index containing only the files accepted by the specified filter. The filter is invoked with the
+	# file paths as they have been stored in the index file.
+	#
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object.
+	# @return		FileIndex									Returns a new index object.
+	#
+	def filter(self, filePathFilter):
+		ret = FileIndex()
+		ret.__pathPrefix = None
+		prefix = self.__pathPrefix or ""
+		relFilePaths = self.getRelFilePaths()
+		if prefix:
+			accepted = filePathFilter.acceptMany([ prefix + p for p in relFilePaths ], self.__fileSizes, self.__fileTimeStamps)
+		else:
+			accepted = filePathFilter.acceptMany(relFilePaths, self.__fileSizes, self.__fileTimeStamps)
+		for row in range(0, len(relFilePaths)):
+			if accepted[row]:
+				ret.addFile(relFilePaths[row], self.__fileSizes[row], self.__fileTimeStamps[row])
+		return ret
+
+	#
+
+
+
+	#
+	# Select the rows of all files accepted by the specified filter. The filter is invoked with the relative file paths.
+	#
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object.
+	# @return		int[]										Returns the selected rows in ascending order.
+	#
+	# Prefix filters (and combinations of prefix filters and other filters using <c>AndFilePathFilter</c>) are served by
+	# range lookups in the list of rows sorted by path: Only the files within the ranges need to be checked.
+	#
+	def selectRows(self, filePathFilter):
+		if isinstance(filePathFilter, PrefixFilePathFilter):
+			return self.selectRowsByPrefix(filePathFilter.prefixes)
+
+		if isinstance(filePathFilter, AndFilePathFilter):
+			prefixFilters = [ f for f in filePathFilter.filters if isinstance(f, PrefixFilePathFilter) ]
+			if prefixFilters:
+				rows = self.selectRowsByPrefix(prefixFilters[0].prefixes)
+				for f in filePathFilter.filters:
+					if f is not prefixFilters[0]:
+						accepted = f.acceptMany([ self.getRelFilePath(row) for row in rows ],
+							[ self.__fileSizes[row] for row in rows ], [ self.__fileTimeStamps[row] for row in rows ])
+						rows = [ row for (row, b) in zip(rows, accepted) if b ]
+				return rows
+
+		accepted = filePathFilter.acceptMany(self.getRelFilePaths(), self.__fileSizes, self.__fileTimeStamps)
+		return [ row for (row, b) in enumerate(accepted) if b ]
+
+	#
+
+
+
+	#
+	# Select the rows of all files with a path starting with one of the specified prefixes. This is performed by a binary
+	# search in the list of rows sorted by path, so only O(log n + k) paths need to be inspected. (The list is built
+	# on first use.)
+	#
+	# @param		str[] prefixes			The path prefixes.
+	# @return		int[]					Returns the selected rows in ascending order.
+	#
+	def selectRowsByPrefix(self, prefixes):
+		if self.__sortedRows is None:
+			relFilePaths = self.getRelFilePaths()
+			self.__sortedRows = array('i', sorted(range(0, len(relFilePaths)), key=relFilePaths.__getitem__))
+		sortedRows = self.__sortedRows
+		getRelFilePath = self.getRelFilePath
+
+		ret = set()
+		for prefix in prefixes:
+			# find the first path not smaller than the prefix
+			lo = 0
+			hi = len(sortedRows)
+			while lo < hi:
+				mid = (lo + hi) // 2
+				if getRelFilePath(sortedRows[mid]) < prefix:
+					lo = mid + 1
+				else:
+					hi = mid
+			# all paths with this prefix follow
+			while (lo < len(sortedRows)) and getRelFilePath(sortedRows[lo]).startswith(prefix):
+				ret.add(sortedRows[lo])
+				lo += 1
+
+		return sorted(ret)
+
+	#
+
+
+
+	#
+	# Add a file to the end of this index.
+	#
+	# @param		str relFilePath			The relative file path
+	# @param		int fileSize			The size of the file in bytes
+	# @param		int timeStampNS			The last modification time stamp in nanoseconds since epoch
+	# @return		int						Returns the row of the file added.
+	#
+	def addFile(self, relFilePath, fileSize, timeStampNS):
+		n = relFilePath.rfind('/')
+		if n > 0:
+			dirID = self.__getOrCreateDirID(relFilePath[0:n])
+			fileName = relFilePath[n + 1:]
+		else:
+			dirID = 0
+			fileName = relFilePath
+
+		row = len(self.__fileNames)
+		self.__sortedRows = None
+		self.__directoryTree = None
+		self.__fileDirIDs.append(dirID)
+		self.__fileNames.append(fileName)
+		self.__fileSizes.append(fileSize)
+		self.__fileTimeStamps.append(timeStampNS)
+		if self.__rowsByFileName is not None:
+			self.__rowsByFileName[dirID][fileName] = row
+		return row
+
+	#
+
+
+
+	def __getOrCreateDirID(self, dirPath):
+		dirID = self.__dirIDsByPath.get(dirPath)
+		if dirID is None:
+			dirID = len(self.__dirPaths)
+			self.__dirIDsByPath[dirPath] = dirID
+			self.__dirPaths.append(dirPath)
+			if self.__rowsByFileName is not None:
+				self.__rowsByFileName.append({})
+		return dirID
+
+	#
+
+
+
+	#
+	# Apply changes to this index in place.
+	#
+	# @param		iterable<tuple> files			Tuples containing the relative path, the size and the time stamp (in nanoseconds since
+	#												epoch) of files that have been added or changed.
+	# @param		iterable<str> removedPaths		The relative paths of files that have been removed.
+	# @return		dict							Returns a dictionary containing the relative paths of all files actually added
+	#												(key "added"), removed (key "removed") and changed (key "changed").
+	#
+	def applyChanges(self, files, removedPaths):
+		added = []
+		removed = []
+		changed = []
+
+		removedRows = set()
+		for relFilePath in removedPaths:
+			row = self.findRow(relFilePath)
+			if (row != None) and (row not in removedRows):
+				removedRows.add(row)
+				removed.append(relFilePath)
+
+		for (relFilePath, fileSize, timeStampNS) in files:
+			row = self.findRow(relFilePath)
+			if (row is None) or (row in removedRows):
+				self.addFile(relFilePath, fileSize, timeStampNS)
+				added.append(relFilePath)
+			elif (self.__fileSizes[row] != fileSize) or (self.__fileTimeStamps[row] != timeStampNS):
+				self.__fileSizes[row] = fileSize
+				self.__fileTimeStamps[row] = timeStampNS
+				self.__directoryTree = None
+				changed.append(relFilePath)
+
+		if removedRows:
+			self.__removeRows(removedRows)
+
+		return {
+			"added": added,
+			"removed": removed,
+			"changed": changed
+		}
+
+	#
+
+
+
+	#
+	# Apply a delta file to this index in place. A delta file is a text file (possibly gzip compressed if the file name ends with
+	# ".gz") that contains one change per line. Each line consists of the following fields separated by tab characters:
+	# * An operation: "+" for a file added, "-" for a file removed, "~" for a file changed
+	# * The size of the file (ignored for "-")
+	# * The last modification time stamp in seconds since epoch (ignored for "-")
+	# * The relative file path, possibly with a leading "./"
+	#
+	# @param		str deltaFilePath							The path of the delta file
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. Files added or changed that are not accepted
+	#															are ignored. (optional)
+	# @return		dict										Returns a dictionary as <c>applyChanges()</c> does.
+	#
+	def applyDeltaFile(self, deltaFilePath, filePathFilter = None):
+		files = []
+		removedPaths = []
+		with (gzip.open(deltaFilePath, mode='rt', encoding='utf-8') if deltaFilePath.endswith(".gz") else open(deltaFilePath, mode='r', encoding='utf-8')) as fin:
+			for line in fin:
+				line = line.strip('\n')
+				if not line:
+					continue
+				(sOperation, sSize, sTimeStamp, sRelPath) = line.split('\t')
+				if sOperation == "-":
+					if sRelPath.startswith("./"):
+						sRelPath = sRelPath[2:]
+					removedPaths.append(sRelPath)
+				elif (sOperation == "+") or (sOperation == "~"):
+					fileSize = int(sSize)
+					timeStampNS = FileIndex.parseTimeStampNS(sTimeStamp)
+					if (filePathFilter is None) or filePathFilter.canAcceptFile(sRelPath, fileSize, timeStampNS):
+						if sRelPath.startswith("./"):
+							sRelPath = sRelPath[2:]
+						files.append((sRelPath, fileSize, timeStampNS))
+				else:
+					raise Exception("Invalid operation in delta file: " + repr(sOperation))
+		return self.applyChanges(files, removedPaths)
+
+	#
+
+
+
+	#
+	# Update this index in place to match a newer version of the index file. Only the differences are applied: The new index
+	# file is parsed line by line and compared with the data in memory.
+	#
+	# @param		str indexFilePath							The path of the new index file
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. This should be the same filter used for
+	#															loading the index in the first place. (optional)
+	# @return		dict										Returns a dictionary as <c>applyChanges()</c> does.
+	#
+	def refreshFromIndexFile(self, indexFilePath, filePathFilter = None):
+		seen = bytearray(len(self.__fileNames))
+		files = []
+		with gzip.open(indexFilePath, mode='rt', encoding='utf-8') as fin:
+			for line in fin:
+				line = line.strip('\n')
+				(sSize, sTimeStamp, sRelPath) = line.split('\t')
+				fileSize = int(sSize)
+				timeStampNS = FileIndex.parseTimeStampNS(sTimeStamp)
+				if (filePathFilter is None) or filePathFilter.canAcceptFile(sRelPath, fileSize, timeStampNS):
+					if sRelPath.startswith("./"):
+						sRelPath = sRelPath[2:]
+					row = self.findRow(sRelPath)
+					if row is None:
+						files.append((sRelPath, fileSize, timeStampNS))
+					else:
+						seen[row] = 1
+						if (self.__fileSizes[row] != fileSize) or (self.__fileTimeStamps[row] != timeStampNS):
+							files.append((sRelPath, fileSize, timeStampNS))
+
+		removedPaths = [ self.getRelFilePath(row) for row in range(0, len(seen)) if not seen[row] ]
+		return self.applyChanges(files, removedPaths)
+
+	#
+
+
+
+	#
+	# Remove the specified rows. All other rows keep their order but get new row numbers. Directories that no longer
+	# contain files are removed from the directory table.
+	#
+	def __removeRows(self, removedRows):
+		keep = [ row not in removedRows for row in range(0, len(self.__fileNames)) ]
+
+		fileDirIDs = [ v for (v, b) in zip(self.__fileDirIDs, keep) if b ]
+		dirIDsUsed = set(fileDirIDs)
+		dirIDMap = {}
+		dirPaths = []
+		for (dirID, dirPath) in enumerate(self.__dirPaths):
+			if (dirID == 0) or (dirID in dirIDsUsed):
+				dirIDMap[dirID] = len(dirPaths)
+				dirPaths.append(dirPath)
+
+		self.__dirPaths = dirPaths
+		self.__dirIDsByPath = { dirPath: dirID for (dirID, dirPath) in enumerate(dirPaths) }
+		self.__fileDirIDs = array('i', [ dirIDMap[v] for v in fileDirIDs ])
+		self.__fileNames = [ v for (v, b) in zip(self.__fileNames, keep) if b ]
+		self.__fileSizes = array('q', [ v for (v, b) in zip(self.__fileSizes, keep) if b ])
+		self.__fileTimeStamps = array('q', [ v for (v, b) in zip(self.__fileTimeStamps, keep) if b ])
+		self.__rowsByFileName = None
+		self.__sortedRows = None
+		self.__directoryTree = None
+
+	#
+
+
+
+	def countFiles(self):
+		return len(self.__fileNames)
+
+	#
+
+
+
+	#
+	# Returns the number of directories that contain files. The root directory is not counted.
+	#
+	def countDirs(self):
+		return len(self.__dirPaths) - 1
+
+	#
+
+
+
+	#
+	# Find the row of the specified file.
+	#
+	# @param		str relFilePath			The relative file path
+	# @return		int						Returns the row or <c>None</c> if there is no such file.
+	#
+	def findRow(self, relFilePath):
+		if self.__rowsByFileName is None:
+			self.__buildRowsByFileName()
+
+		n = relFilePath.rfind('/')
+		if n > 0:
+			dirID = self.__dirIDsByPath.get(relFilePath[0:n])
+			if dirID is None:
+				return None
+			return self.__rowsByFileName[dirID].get(relFilePath[n + 1:])
+		else:
+			return self.__rowsByFileName[0].get(relFilePath)
+
+	#
+
+
+
+	def __buildRowsByFileName(self):
+		rowsByFileName = [ {} for dirPath in self.__dirPaths ]
+		fileNames = self.__fileNames
+		row = 0
+		for dirID in self.__fileDirIDs:
+			rowsByFileName[dirID][fileNames[row]] = row
+			row += 1
+		self.__rowsByFileName = rowsByFileName
+
+	#
+
+
+
+	def getRelFilePath(self, row):
+		dirID = self.__fileDirIDs[row]
+		if dirID == 0:
+			return self.__fileNames[row]
+		else:
+			return self.__dirPaths[dirID] + "/" + self.__fileNames[row]
+
+	#
+
+
+
+	#
+	# Returns a list of the relative paths of all files.
+	#
+	def getRelFilePaths(self):
+		dirPaths = [ p + "/" if p else p for p in self.__dirPaths ]
+		return [ dirPaths[dirID] + fileName for (dirID, fileName) in zip(self.__fileDirIDs, self.__fileNames) ]
+
+	#
+
+
+
+	def getFileSize(self, row):
+		return self.__fileSizes[row]
+
+	#
+
+
+
+	def getTimeStampNS(self, row):
+		return self.__fileTimeStamps[row]
+
+	#
+
+
+
+	#
+	# Returns the last modification time stamp of the specified file as <c>datetime</c> object.
+	#
+	def getTimeStamp(self, row):
+		return FileIndex.timeStampNSToDateTime(self.__fileTimeStamps[row])
+
+	#
+
+
+
+	#
+	# Returns the directory tree of the files in this index. The tree contains all directories that contain files and all
+	# of their parent directories. The tree is built on first use.
+	#
+	# @return		DirectoryTreeNode		Returns the root node.
+	#
+	def getDirectoryTree(self):
+		if self.__directoryTree is None:
+			nDirs = len(self.__dirPaths)
+			fileCounts = [ 0 ] * nDirs
+			fileSizes = [ 0 ] * nDirs
+			newestTimeStamps = [ None ] * nDirs
+			for (dirID, fileSize, timeStampNS) in zip(self.__fileDirIDs, self.__fileSizes, self.__fileTimeStamps):
+				fileCounts[dirID] += 1
+				fileSizes[dirID] += fileSize
+				t = newestTimeStamps[dirID]
+				if (t is None) or (timeStampNS > t):
+					newestTimeStamps[dirID] = timeStampNS
+			self.__directoryTree = DirectoryTreeNode.buildTree(zip(self.__dirPaths, fileCounts, fileSizes, newestTimeStamps))
+		return self.__directoryTree
+
+	#
+
+
+
+	#
+	# Returns a list of paths of all directories that contain files, in the order they occur in the index.
+	# The root directory is not included.
+	#
+	def getDirPaths(self):
+		return self.__dirPaths[1:]
+
+	#
+
+
+
+#
+
+
+
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+import fnmatch
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all file paths that match a shell style wildcard pattern such as "<c>*.txt</c>" or "<c>data/*/2017-??-*</c>".
+# Please note that as with <c>fnmatch</c> a "<c>*</c>" matches "<c>/</c>" characters as well. One or more patterns can be specified.
+#
+class GlobFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		str|str[] globPattern		A single wildcard pattern or a list of wildcard patterns.
+	#
+	def __init__(self, globPattern):
+		if isinstance(globPattern, str):
+			self.__globPatterns = ( globPattern, )
+		else:
+			self.__globPatterns = tuple(globPattern)
+			assert len(self.__globPatterns) > 0
+			for g in self.__globPatterns:
+				assert isinstance(g, str)
+		self.__regEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def globPatterns(self):
+		return self.__globPatterns
+
+
+	def canAccept(self, filePath):
+		return self.__regEx.match(filePath) is not None
+
+
+	def _getRegExPattern(self):
+		return "(?:" + "|".join([ fnmatch.translate(g) for g in self.__globPatterns ]) + ")"
+
+
+	def _getCompiledRegEx(self):
+		return self.__regEx
+
+
+
+
+
+
+
@@ -15,56 +15,64 @@ from datetime import datetime
 import sh
 
 from .AbstractFileInterface import AbstractFileInterface
+from .FileIndex import FileIndex
+from .StreamingFileIndex import StreamingFileIndex
 
 
 
 
 class LocalFileInterface(AbstractFileInterface):
 
-	def __init__(self, rootDirPath, fileSetName, filePathFilter):
+	#
+	# @param		str rootDirPath								The base directory
+	# @param		str fileSetName								The name of the file set
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. (optional)
+	# @param		str cacheDirPath							(optional) A directory to store binary cache files of parsed file
+	#															indices in. If specified, later instances will load the cache file
+	#															instead of parsing the index again as long as the index has not changed.
+	# @param		bool bStreaming								(optional) If <c>True</c> the index is not loaded into memory. Instead it is
+	#															parsed incrementally every time data is requested. In this mode field 1 of
+	#															the tuples provided by the iterators is <c>None</c> unless the number of
+	#															entries has been determined before by <c>countFiles()</c> or <c>countDirs()</c>.
+	#															<c>cacheDirPath</c> is ignored in this mode.
+	# @param		int numParserProcesses						(optional) The number of processes to parse the index with. Parsing
+	#															very large indices benefits from using multiple processes.
+	#
+	def __init__(self, rootDirPath, fileSetName, filePathFilter, cacheDirPath = None, bStreaming = False, numParserProcesses = 1):
 		rootDirPath = os.path.abspath(rootDirPath)
 
 		self.__rootDirPath = rootDirPath
 		self.__fileSetName = fileSetName
-		self.__fileSizes = []
-		self.__relFilePaths = []
-		self.__filePaths = []
-		self.__relDirPaths = []
-		self.__timeStamps = []
+		self.__filePathFilter = filePathFilter
+		self.__fileIndex = None
+		self.__streamingFileIndex = None
 
-		# download file index
+		# load file index
 		path = os.path.join(rootDirPath, fileSetName + ".index.gz")
-		nCountLines = 0
-		with gzip.open(path, mode='rt', encoding='utf-8') as fin:
-			for line in fin:
-				nCountLines += 1
-				line = line.strip('\n')
-				(sSize, sTimeStamp, sRelPath) = line.split('\t')
-				if (filePathFilter is None) or filePathFilter.canAccept(sRelPath):
-					self.__fileSizes.append(int(sSize))
-					if sRelPath.startswith("./"):
-						sRelPath = sRelPath[2:]
-					n = sRelPath.rfind('/')
-					if n > 0:
-						sRelDirPath = sRelPath[0:n]
-						if (len(self.__relDirPaths) == 0) or (self.__relDirPaths[len(self.__relDirPaths) - 1] != sRelDirPath):
-							self.__relDirPaths.append(sRelDirPath)
-					abspath = os.path.abspath(os.path.join(rootDirPath, sRelPath))
-					abspath = abspath[len(rootDirPath) + 1:]
-					self.__relFilePaths.append(sRelPath)
-					self.__filePaths.append(abspath)
-					timeStamp = datetime.utcfromtimestamp(float(sTimeStamp))
-					self.__timeStamps.append(timeStamp)
+		if bStreaming:
+			if not os.path.isfile(path):
+				raise Exception("No such file: " + path)
+			self.__streamingFileIndex = StreamingFileIndex(path, filePathFilter)
+		elif cacheDirPath is None:
+			self.__fileIndex = FileIndex.loadFromIndexFile(path, filePathFilter, numParserProcesses)
+		else:
+			statResult = os.stat(path)
+			self.__fileIndex = FileIndex.loadCached(cacheDirPath, "file://localhost" + path, statResult.st_size, statResult.st_mtime_ns,
+				lambda: path, filePathFilter, numParserProcesses)
 
 
 
 	def countFiles(self):
-		return len(self.__filePaths)
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.countFiles()
+		return self.__fileIndex.countFiles()
 
 
 
 	def countDirs(self):
-		return len(self.__relDirPaths)
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.countDirs()
+		return self.__fileIndex.countDirs()
 
 
 
@@ -98,19 +106,27 @@ class LocalFileInterface(AbstractFileInterface):
 	#												described above.
 	#
 	def getFileIterator(self, filter = None):
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownFileCount if filter is None else None
+			i = 0
+			for (relFilePath, fileSize, timeStampNS) in self.__streamingFileIndex.iterateFiles(filter):
+				path = os.path.join(self.__rootDirPath, self.__fileSetName, relFilePath)
+				yield (i, nmax, relFilePath, fileSize, FileIndex.timeStampNSToDateTime(timeStampNS), path, False)
+				i += 1
+			return
+
+		fileIndex = self.__fileIndex
 		if filter is None:
-			selectedFilePaths = self.__filePaths
+			selectedRows = range(0, fileIndex.countFiles())
 		else:
-			selectedFilePaths = []
-			for p in self.__filePaths:
-				if filter.canAccept(p):
-					selectedFilePaths.append(p)
+			selectedRows = fileIndex.selectRows(filter)
 
-		nmax = len(selectedFilePaths)
+		nmax = len(selectedRows)
 		i = 0
-		for relFilePath in selectedFilePaths:
+		for row in selectedRows:
+			relFilePath = fileIndex.getRelFilePath(row)
 			path = os.path.join(self.__rootDirPath, self.__fileSetName, relFilePath)
-			yield (i, nmax, relFilePath, self.__fileSizes[i], self.__timeStamps[i], path, False)
+			yield (i, nmax, relFilePath, fileIndex.getFileSize(row), fileIndex.getTimeStamp(row), path, False)
 			i += 1
 
 
@@ -137,13 +153,18 @@ class LocalFileInterface(AbstractFileInterface):
 	# @return		tuple					Returns a file tuple.
 	#
 	def getFileByPath(self, relFilePath):
-		i = 0
-		for relFilePath2 in self.__relFilePaths:
-			if relFilePath == relFilePath2:
-				path = os.path.join(self.__rootDirPath, self.__fileSetName, relFilePath)
-				return (relFilePath, self.__fileSizes[i], self.__timeStamps[i], path, False)
-			i += 1
-		return None
+		if self.__streamingFileIndex != None:
+			fileData = self.__streamingFileIndex.findFile(relFilePath)
+			if fileData is None:
+				return None
+			path = os.path.join(self.__rootDirPath, self.__fileSetName, relFilePath)
+			return (relFilePath, fileData[0], FileIndex.timeStampNSToDateTime(fileData[1]), path, False)
+
+		row = self.__fileIndex.findRow(relFilePath)
+		if row is None:
+			return None
+		path = os.path.join(self.__rootDirPath, self.__fileSetName, relFilePath)
+		return (relFilePath, self.__fileIndex.getFileSize(row), self.__fileIndex.getTimeStamp(row), path, False)
 
 
 
@@ -161,11 +182,64 @@ class LocalFileInterface(AbstractFileInterface):
 	#								described above.
 	#
 	def getFilePathIterator(self):
-		nmax = len(self.__relFilePaths)
-		i = 0
-		for relFilePath in self.__relFilePaths:
-			yield (i, nmax, relFilePath, self.__fileSizes[i], self.__timeStamps[i])
-			i += 1
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownFileCount
+			i = 0
+			for (relFilePath, fileSize, timeStampNS) in self.__streamingFileIndex.iterateFiles():
+				yield (i, nmax, relFilePath, fileSize, FileIndex.timeStampNSToDateTime(timeStampNS))
+				i += 1
+			return
+
+		fileIndex = self.__fileIndex
+		nmax = fileIndex.countFiles()
+		for i in range(0, nmax):
+			yield (i, nmax, fileIndex.getRelFilePath(i), fileIndex.getFileSize(i), fileIndex.getTimeStamp(i))
+
+
+
+	#
+	# Update the file index in place to match the current version of the index file. Only the differences are applied.
+	# This is not supported in streaming mode (and not necessary as the index file is read again on every request).
+	#
+	# @param		string indexFilePath		(optional) The path of a different index file to read.
+	# @return		dict						Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#											removed (key "removed") and changed (key "changed").
+	#
+	def refreshIndex(self, indexFilePath = None):
+		if self.__streamingFileIndex != None:
+			raise Exception("Not supported in streaming mode!")
+		if indexFilePath is None:
+			indexFilePath = os.path.join(self.__rootDirPath, self.__fileSetName + ".index.gz")
+		return self.__fileIndex.refreshFromIndexFile(indexFilePath, self.__filePathFilter)
+
+
+
+	#
+	# Apply a delta file to the file index in place. See <c>FileIndex.applyDeltaFile()</c> for a description of the format.
+	# This is not supported in streaming mode.
+	#
+	# @param		string deltaFilePath		The path of the delta file.
+	# @return		dict						Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#											removed (key "removed") and changed (key "changed").
+	#
+	def applyIndexDelta(self, deltaFilePath):
+		if self.__streamingFileIndex != None:
+			raise Exception("Not supported in streaming mode!")
+		return self.__fileIndex.applyDeltaFile(deltaFilePath, self.__filePathFilter)
+
+
+
+	#
+	# Get the directory tree of the files this object can provide. Each node of the tree provides the number of files,
+	# their total size and the newest modification time stamp, both for the files directly contained and for the whole
+	# subtree. In streaming mode the tree is built by a pass over the index on every invocation.
+	#
+	# @return	DirectoryTreeNode	Returns the root node of the tree.
+	#
+	def getDirectoryTree(self):
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.getDirectoryTree()
+		return self.__fileIndex.getDirectoryTree()
 
 
 
@@ -181,9 +255,18 @@ class LocalFileInterface(AbstractFileInterface):
 	#								described above.
 	#
 	def getDirPathIterator(self):
-		nmax = len(self.__relDirPaths)
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownDirCount
+			i = 0
+			for relDirPath in self.__streamingFileIndex.iterateDirPaths():
+				yield (i, nmax, relDirPath)
+				i += 1
+			return
+
+		relDirPaths = self.__fileIndex.getDirPaths()
+		nmax = len(relDirPaths)
 		i = 0
-		for relDirPath in self.__relDirPaths:
+		for relDirPath in relDirPaths:
 			yield (i, nmax, relDirPath)
 			i += 1
 
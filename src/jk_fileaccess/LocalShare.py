@@ -9,6 +9,13 @@ import sys
 import datetime
 import stat
 import shutil
+import errno
+import mmap
+import contextlib
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
 
 import jk_temporary
 
@@ -16,6 +23,14 @@ from .AbstractShare import *
 
 
 
+# ioctl() request for cloning a file (Linux only)
+_FICLONE = 0x40049409 if sys.platform.startswith("linux") else None
+
+# errors indicating that a system call for copying data can not be used for the files specified
+_ERRNOS_NOT_SUPPORTED = ( errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF, errno.EPERM )
+
+
+
 
 
 
@@ -181,10 +196,10 @@ class LocalShare(AbstractShare):
 		with open(localInputFilePath, mode="rb") as fin:
 			with open(path, mode="wb") as fout:
 				if self.__fileMode != None:
-					os.fchmod(fout, self.__fileMode)
+					os.fchmod(fout.fileno(), self.__fileMode)
 				if self.__uid != None:
-					os.fchown(fout, self.__uid, self.__gid)
-				shutil.copyfileobj(fin, fout, 65536)
+					os.fchown(fout.fileno(), self.__uid, self.__gid)
+				self.__copyFileData(fin, fout)
 
 		# fileSize2 = os.stat(path).st_size
 		# assert fileSize == fileSize2
@@ -196,15 +211,61 @@ class LocalShare(AbstractShare):
 
 
 
+	#
+	# Copy all data from one file to another. The data is copied within the kernel if possible: First a reflink is tried
+	# (which shares the data blocks of the file if the file system supports this), then <c>copy_file_range()</c> and
+	# <c>sendfile()</c>. Only if none of these are supported the data is copied in user space.
+	#
+	# @param		file fin			The file to read from
+	# @param		file fout			The file to write to. This file must be empty.
+	#
+	def __copyFileData(self, fin, fout):
+		fdIn = fin.fileno()
+		fdOut = fout.fileno()
+
+		if (fcntl != None) and (_FICLONE != None):
+			try:
+				fcntl.ioctl(fdOut, _FICLONE, fdIn)
+				return
+			except OSError as e:
+				pass
+
+		blockSize = 1024 * 1024 * 8
+
+		if hasattr(os, "copy_file_range"):
+			try:
+				while os.copy_file_range(fdIn, fdOut, blockSize) > 0:
+					pass
+				return
+			except OSError as e:
+				if e.errno not in _ERRNOS_NOT_SUPPORTED:
+					raise
+
+		if hasattr(os, "sendfile"):
+			try:
+				while os.sendfile(fdOut, fdIn, None, blockSize) > 0:
+					pass
+				return
+			except OSError as e:
+				if e.errno not in _ERRNOS_NOT_SUPPORTED:
+					raise
+
+		# all data copied so far has advanced the file positions, so we can continue from here
+		shutil.copyfileobj(fin, fout, blockSize)
+
+	#
+
+
+
 	def _writeAllDataToFile(self, remoteOutputFilePath, fileData, timeStamp = None):
 		remotePath = self.__buildPath(remoteOutputFilePath)
 		# print(">> " + remotePath)
 		# print("\t" + str(len(fileData)))
 		with open(remotePath, mode="wb") as fout:
 			if self.__fileMode != None:
-				os.fchmod(fout, self.__fileMode)
+				os.fchmod(fout.fileno(), self.__fileMode)
 			if self.__uid != None:
-				os.fchown(fout, self.__uid, self.__gid)
+				os.fchown(fout.fileno(), self.__uid, self.__gid)
 			fout.write(fileData)
 		if timeStamp != None:
 			os.utime(remotePath, (int(timeStamp / 1000), int(timeStamp / 1000)))
@@ -212,6 +273,99 @@ class LocalShare(AbstractShare):
 
 
 
+	def _writeChunksToFile(self, remoteOutputFilePath, chunks, timeStamp = None):
+		remotePath = self.__buildPath(remoteOutputFilePath)
+		with open(remotePath, mode="wb") as fout:
+			if self.__fileMode != None:
+				os.fchmod(fout.fileno(), self.__fileMode)
+			if self.__uid != None:
+				os.fchown(fout.fileno(), self.__uid, self.__gid)
+			for chunk in chunks:
+				fout.write(chunk)
+		if timeStamp != None:
+			os.utime(remotePath, (int(timeStamp / 1000), int(timeStamp / 1000)))
+	#
+
+
+
+	def open(self, path, mode = "rb", bufferSize = 65536):
+		(bReadable, bWritable, bCreate, bTruncate, bAppend) = self._parseOpenMode(mode)
+		path = self.__buildPath(path)
+		f = open(path, mode, buffering = bufferSize)
+		if bCreate:
+			if self.__fileMode != None:
+				os.fchmod(f.fileno(), self.__fileMode)
+			if self.__uid != None:
+				os.fchown(f.fileno(), self.__uid, self.__gid)
+		return f
+
+	#
+
+
+
+	def readRanges(self, path, ranges):
+		ranges = self._verifyRanges(ranges)
+		path = self.__buildPath(path)
+		ret = []
+		fd = os.open(path, os.O_RDONLY)
+		try:
+			for (offset, length) in ranges:
+				data = os.pread(fd, length, offset)
+				if 0 < len(data) < length:
+					# short read: collect the remaining data
+					chunks = [ data ]
+					n = len(data)
+					while n < length:
+						data = os.pread(fd, length - n, offset + n)
+						if not data:
+							break
+						chunks.append(data)
+						n += len(data)
+					data = b"".join(chunks)
+				ret.append(data)
+		finally:
+			os.close(fd)
+		return ret
+
+	#
+
+
+
+	#
+	# Map a file into memory. The content is provided as a read-only <c>memoryview</c> that can be parsed, hashed or sliced
+	# without copying the data. The pages are loaded on demand and shared with all other processes reading the same file.
+	# Use this method as a context manager: The file is unmapped on leaving the context. All views derived from the view
+	# provided must be released by then.
+	#
+	# @param		str path				The absolute path of the file.
+	# @return		memoryview				Returns a read-only view of the file content.
+	#
+	@contextlib.contextmanager
+	def mapFile(self, path):
+		path = self.__buildPath(path)
+		with open(path, mode="rb") as fin:
+			if os.fstat(fin.fileno()).st_size == 0:
+				# empty files can't be mapped
+				m = None
+			else:
+				m = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+		if m is None:
+			yield memoryview(b"")
+			return
+
+		try:
+			view = memoryview(m)
+			try:
+				yield view
+			finally:
+				view.release()
+		finally:
+			m.close()
+
+	#
+
+
+
 	def readAllDataFromFile(self, path):
 		path = self.__buildPath(path)
 		# print("<< " + path)
@@ -224,6 +378,26 @@ class LocalShare(AbstractShare):
 
 
 
+	def downloadFile(self, remoteInputFilePath, localOutputFilePath):
+		path = self.__buildPath(remoteInputFilePath)
+		shutil.copyfile(path, localOutputFilePath)
+		statStruct = os.stat(path)
+		os.utime(localOutputFilePath, ns=(statStruct.st_atime_ns, statStruct.st_mtime_ns))
+
+	#
+
+
+
+	#
+	# Local file operations are performed on a thread pool.
+	#
+	def _getBatchConcurrency(self):
+		return min(32, (os.cpu_count() or 1) + 4)
+
+	#
+
+
+
 	def deleteEmptyDirectory(self, path):
 		path = self.__buildPath(path)
 		os.rmdir(path)
@@ -259,32 +433,42 @@ class LocalShare(AbstractShare):
 
 
 
+	def stat(self, path):
+		fullPath = self.__buildPath(path)
+		try:
+			statStruct = os.stat(fullPath)
+		except (FileNotFoundError, NotADirectoryError):
+			return None
+		return self._buildStatTuple(os.path.basename(fullPath), statStruct.st_mode, statStruct.st_uid, statStruct.st_gid,
+			statStruct.st_size, statStruct.st_mtime)
+
+	#
+
+
+
 	#
 	# Returns the contents of the specified directory. Only the file names are returned. This method is significantly faster
-	# than <c>listDirectoryContent()</c> as no additional data needs to be retrieved for each directory entry.
+	# than <c>listDirectoryContent()</c> as no additional data needs to be retrieved for each directory entry: The type of
+	# an entry is provided by the operating system while reading the directory (except for symbolic links).
 	#
 	# @return		string[]		Returns an array of strings containing the names of the directory entries.
 	#
 	#
 	def listDirectoryContentNames(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
 		path = self.__buildPath(path)
-		if path.endswith("/"):
-			path2 = path
-			if len(path) > 1:
-				path = path[:-1]
-		else:
-			path2 = path + "/"
+		if bIncludeSubDirs and bIncludeFiles and bIncludeOthers:
+			return os.listdir(path)
 		ret = []
-		for dirEntry in os.listdir(path):
-			statStruct = os.stat(path2 + dirEntry)
-			if stat.S_ISDIR(statStruct.st_mode):
-				if bIncludeSubDirs:
-					ret.append(dirEntry)
-			elif stat.S_ISREG(statStruct.st_mode):
-				if bIncludeFiles:
-					ret.append(dirEntry)
-			elif bIncludeOthers:
-				ret.append(dirEntry)
+		with os.scandir(path) as it:
+			for dirEntry in it:
+				if dirEntry.is_dir():
+					if bIncludeSubDirs:
+						ret.append(dirEntry.name)
+				elif dirEntry.is_file():
+					if bIncludeFiles:
+						ret.append(dirEntry.name)
+				elif bIncludeOthers:
+					ret.append(dirEntry.name)
 		return ret
 
 	#
@@ -292,7 +476,7 @@ class LocalShare(AbstractShare):
 
 
 	#
-	# Returns the contents of the specified directory.
+	# Returns the contents of the specified directory. Entries are only stat()ed if they are included in the result.
 	#
 	# @return		tuple[]		Returns an array of tuples containing data about the directory entries. Each tuple contains the following data:
 	#							* string: The file or directory Name
@@ -305,29 +489,40 @@ class LocalShare(AbstractShare):
 	#
 	def listDirectoryContent(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
 		path = self.__buildPath(path)
-		if path.endswith("/"):
-			path2 = path
-			if len(path) > 1:
-				path = path[:-1]
-		else:
-			path2 = path + "/"
 		ret = []
-		for dirEntry in os.listdir(path):
-			statStruct = os.stat(path2 + dirEntry)
-			if stat.S_ISDIR(statStruct.st_mode):
-				if bIncludeSubDirs:
-					ret.append((dirEntry, 'd', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, None, None))
-			elif stat.S_ISREG(statStruct.st_mode):
-				if bIncludeFiles:
-					ret.append((dirEntry, 'f', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, statStruct.st_size, int(statStruct.st_mtime) * 1000))
-			elif bIncludeOthers:
-				ret.append((dirEntry, '?', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, statStruct.st_size, int(statStruct.st_mtime) * 1000))
+		with os.scandir(path) as it:
+			for dirEntry in it:
+				if dirEntry.is_dir():
+					if bIncludeSubDirs:
+						statStruct = dirEntry.stat()
+						ret.append((dirEntry.name, 'd', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, None, None))
+				elif dirEntry.is_file():
+					if bIncludeFiles:
+						statStruct = dirEntry.stat()
+						ret.append((dirEntry.name, 'f', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, statStruct.st_size, int(statStruct.st_mtime) * 1000))
+				elif bIncludeOthers:
+					try:
+						statStruct = dirEntry.stat()
+					except FileNotFoundError:
+						# dangling symbolic link
+						statStruct = dirEntry.stat(follow_symlinks=False)
+					ret.append((dirEntry.name, '?', statStruct.st_mode, statStruct.st_uid, statStruct.st_gid, statStruct.st_size, int(statStruct.st_mtime) * 1000))
 		return ret
 
 	#
 
 
 
+	#
+	# Directories can be listed by any number of threads at the same time.
+	#
+	def _acquireDirectoryListers(self, numThreads):
+		return [ self.listDirectoryContent ] * numThreads
+
+	#
+
+
+
 	def _createRandomFilePath(self, dirPath, prefix = 'tmp_', randomNameLength = 32, postfix = ''):
 		dirPath2 = self.__buildPath(dirPath)
 		dirPath = jk_temporary.createRandomFilePath(dirPath2, prefix = prefix, randomNameLength = randomNameLength, postfix = postfix)
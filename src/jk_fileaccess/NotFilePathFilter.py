@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all files not accepted by the specified filter.
+#
+class NotFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		AbstractFilePathFilter filter		The filter to negate
+	#
+	def __init__(self, filter):
+		assert isinstance(filter, AbstractFilePathFilter)
+		self.__filter = filter
+		self.__regEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def filter(self):
+		return self.__filter
+
+
+	def canAccept(self, filePath):
+		return not self.__filter.canAccept(filePath)
+
+
+	def canAcceptFile(self, filePath, fileSize, timeStampNS):
+		return not self.__filter.canAcceptFile(filePath, fileSize, timeStampNS)
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		return [ not b for b in self.__filter.acceptMany(filePaths, fileSizes, timeStampsNS) ]
+
+
+	def _getRegExPattern(self):
+		pattern = self.__filter._getRegExPattern()
+		if pattern is None:
+			return None
+		return "(?!" + pattern + ")"
+
+
+	def _getCompiledRegEx(self):
+		return self.__regEx
+
+
+
+
+
+
+
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all files accepted by at least one of the specified filters.
+#
+# If all filters can be expressed as regular expressions they are compiled into a single regular expression.
+#
+class OrFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		AbstractFilePathFilter[] filters		The filters to combine
+	#
+	def __init__(self, *filters):
+		if (len(filters) == 1) and isinstance(filters[0], (list, tuple)):
+			filters = filters[0]
+		assert len(filters) > 0
+		for f in filters:
+			assert isinstance(f, AbstractFilePathFilter)
+		self.__filters = tuple(filters)
+		self.__regEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def filters(self):
+		return self.__filters
+
+
+	def canAccept(self, filePath):
+		if self.__regEx != None:
+			return self.__regEx.match(filePath) is not None
+		for f in self.__filters:
+			if f.canAccept(filePath):
+				return True
+		return False
+
+
+	def canAcceptFile(self, filePath, fileSize, timeStampNS):
+		if self.__regEx != None:
+			return self.__regEx.match(filePath) is not None
+		for f in self.__filters:
+			if f.canAcceptFile(filePath, fileSize, timeStampNS):
+				return True
+		return False
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		if self.__regEx != None:
+			return AbstractFilePathFilter.acceptMany(self, filePaths, fileSizes, timeStampsNS)
+		ret = None
+		for f in self.__filters:
+			results = f.acceptMany(filePaths, fileSizes, timeStampsNS)
+			if ret is None:
+				ret = results
+			else:
+				ret = [ a or b for (a, b) in zip(ret, results) ]
+		return ret
+
+
+	def _getRegExPattern(self):
+		patterns = [ f._getRegExPattern() for f in self.__filters ]
+		if None in patterns:
+			return None
+		if len(patterns) == 1:
+			return patterns[0]
+		return "(?:" + "|".join(patterns) + ")"
+
+
+	def _getCompiledRegEx(self):
+		return self.__regEx
+
+
+
+
+
+
+
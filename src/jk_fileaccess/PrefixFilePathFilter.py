@@ -10,19 +10,51 @@ import sys
 import codecs
 import random
 import string
+import re
 
 from .AbstractFilePathFilter import AbstractFilePathFilter
 
 
 
+#
+# This filter accepts all file paths that start with a prefix. One or more prefixes can be specified.
+#
 class PrefixFilePathFilter(AbstractFilePathFilter):
 
+	#
+	# @param		str|str[] prefix		A single prefix or a list of prefixes.
+	#
 	def __init__(self, prefix):
-		self.__prefix = prefix
+		if isinstance(prefix, str):
+			self.__prefixes = ( prefix, )
+		else:
+			self.__prefixes = tuple(prefix)
+			assert len(self.__prefixes) > 0
+			for p in self.__prefixes:
+				assert isinstance(p, str)
+		self.__regEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def prefixes(self):
+		return self.__prefixes
 
 
 	def canAccept(self, filePath):
-		return filePath.startswith(self.__prefix)
+		return filePath.startswith(self.__prefixes)
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		prefixes = self.__prefixes
+		return [ filePath.startswith(prefixes) for filePath in filePaths ]
+
+
+	def _getRegExPattern(self):
+		return "(?:" + "|".join([ re.escape(p) for p in self.__prefixes ]) + ")"
+
+
+	def _getCompiledRegEx(self):
+		return self.__regEx
 
 
 
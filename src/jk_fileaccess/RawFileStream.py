@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import io
+
+
+
+
+#
+# This class adapts a file handle of some kind of share to the interface of a raw binary stream. Wrapped by
+# <c>io.BufferedReader</c>, <c>io.BufferedWriter</c> or <c>io.BufferedRandom</c> this provides a regular buffered file object.
+#
+class RawFileStream(io.RawIOBase):
+
+	#
+	# @param		callable fnRead			A function that receives the maximum number of bytes to read and returns the data read.
+	#										Specify <c>None</c> if the stream is not readable.
+	# @param		callable fnWrite		A function that receives the data to write and returns the number of bytes written.
+	#										Specify <c>None</c> if the stream is not writable.
+	# @param		callable fnSeek			A function that receives an offset and a value specifying how to interpret the offset
+	#										(as with <c>os.lseek()</c>). It returns the new position.
+	# @param		callable fnClose		A function that closes the underlying file handle.
+	#
+	def __init__(self, fnRead, fnWrite, fnSeek, fnClose):
+		super().__init__()
+		self.__fnRead = fnRead
+		self.__fnWrite = fnWrite
+		self.__fnSeek = fnSeek
+		self.__fnClose = fnClose
+
+	#
+
+
+
+	def readable(self):
+		return self.__fnRead != None
+
+	#
+
+
+
+	def writable(self):
+		return self.__fnWrite != None
+
+	#
+
+
+
+	def seekable(self):
+		return True
+
+	#
+
+
+
+	def readinto(self, buffer):
+		if self.__fnRead is None:
+			raise io.UnsupportedOperation("Stream is not readable!")
+		data = self.__fnRead(len(buffer))
+		n = len(data)
+		buffer[0:n] = data
+		return n
+
+	#
+
+
+
+	def write(self, data):
+		if self.__fnWrite is None:
+			raise io.UnsupportedOperation("Stream is not writable!")
+		n = self.__fnWrite(bytes(data))
+		if n is None:
+			n = len(data)
+		return n
+
+	#
+
+
+
+	def seek(self, offset, whence = io.SEEK_SET):
+		return self.__fnSeek(offset, whence)
+
+	#
+
+
+
+	def close(self):
+		if not self.closed:
+			try:
+				super().close()
+			finally:
+				self.__fnClose()
+
+	#
+
+
+
+#
+
+
+
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all file paths that contain a match of a regular expression. (If you want to match the whole path
+# use "<c>^</c>" and "<c>$</c>" in your pattern.)
+#
+class RegExFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		str pattern		A regular expression pattern.
+	#
+	def __init__(self, pattern):
+		assert isinstance(pattern, str)
+		self.__pattern = pattern
+		self.__regEx = re.compile(pattern)
+		self.__combinedRegEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def pattern(self):
+		return self.__pattern
+
+
+	def canAccept(self, filePath):
+		return self.__regEx.search(filePath) is not None
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		search = self.__regEx.search
+		return [ search(filePath) is not None for filePath in filePaths ]
+
+
+	def _getRegExPattern(self):
+		# patterns with global flags or back references can't be embedded into other patterns
+		if self.__pattern.startswith("(?") and (self.__pattern[2:3] not in ( ":", "=", "!", "<", "P", "#" )):
+			return None
+		if re.search(r"\\[1-9]|\(\?P=", self.__pattern):
+			return None
+		return "(?:.*?(?:" + self.__pattern + "))"
+
+
+	def _getCompiledRegEx(self):
+		return self.__combinedRegEx
+
+
+
+
+
+
+
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import os
+import hashlib
+import concurrent.futures
+
+
+
+
+#
+# Instances of this class transfer single large files over SFTP in segments. The file is split into ranges that are
+# transferred concurrently, each over an SFTP client of its own. The segments are written in place at their offsets
+# into the target file. After the transfer the size of the target file is verified. Optionally the content of each
+# segment is read back from the target and compared against a checksum of the data transferred.
+#
+class SegmentedSftpTransfer(object):
+
+	#
+	# @param		callable fnOpenSftpClient		A function that opens a new SFTP client. It must return a tuple containing a
+	#												<c>paramiko.SFTPClient</c> object and a function that closes it again.
+	# @param		int numSegments					The maximum number of segments to transfer concurrently.
+	# @param		int blockSize					The number of bytes to read or write with a single call. Segment boundaries
+	#												are aligned to this size.
+	# @param		bool bVerifyChecksum			If <c>True</c> every segment is read back from the target after the transfer
+	#												and compared against a SHA-256 checksum of the data transferred.
+	#
+	def __init__(self, fnOpenSftpClient, numSegments = 4, blockSize = 1024 * 1024, bVerifyChecksum = False):
+		assert callable(fnOpenSftpClient)
+		assert isinstance(numSegments, int)
+		assert numSegments > 0
+		assert isinstance(blockSize, int)
+		assert blockSize > 0
+		assert isinstance(bVerifyChecksum, bool)
+
+		self.__fnOpenSftpClient = fnOpenSftpClient
+		self.__numSegments = numSegments
+		self.__blockSize = blockSize
+		self.__bVerifyChecksum = bVerifyChecksum
+
+	#
+
+
+
+	@property
+	def numSegments(self):
+		return self.__numSegments
+
+	#
+
+
+
+	@property
+	def bVerifyChecksum(self):
+		return self.__bVerifyChecksum
+
+	#
+
+
+
+	#
+	# Split a file into segments.
+	#
+	# @return		tuple[]			Returns a list of tuples containing offset and length of each segment.
+	#
+	def __getSegments(self, fileSize):
+		numBlocks = (fileSize + self.__blockSize - 1) // self.__blockSize
+		numSegments = min(self.__numSegments, numBlocks)
+		ret = []
+		offset = 0
+		for i in range(0, numSegments):
+			endBlock = numBlocks * (i + 1) // numSegments
+			end = min(endBlock * self.__blockSize, fileSize)
+			ret.append((offset, end - offset))
+			offset = end
+		return ret
+
+	#
+
+
+
+	def __performConcurrently(self, fnSegment, segments):
+		if len(segments) <= 1:
+			return [ fnSegment(offset, length) for (offset, length) in segments ]
+		with concurrent.futures.ThreadPoolExecutor(max_workers=len(segments)) as executor:
+			futures = [ executor.submit(fnSegment, offset, length) for (offset, length) in segments ]
+			return [ future.result() for future in futures ]
+
+	#
+
+
+
+	#
+	# Upload a local file.
+	#
+	# @param		str localFilePath			The path of the local file
+	# @param		str remoteFilePath			The absolute path of the remote file. If this file exists it is overwritten.
+	#
+	def upload(self, localFilePath, remoteFilePath):
+		blockSize = self.__blockSize
+
+		fdIn = os.open(localFilePath, os.O_RDONLY)
+		try:
+			fileSize = os.fstat(fdIn).st_size
+			segments = self.__getSegments(fileSize)
+
+			(sftpClient, fnClose) = self.__fnOpenSftpClient()
+			try:
+				# create the target file; the segments are written into it in place
+				sftpClient.open(remoteFilePath, mode="wb").close()
+
+				def uploadSegment(offset, length):
+					digest = hashlib.sha256() if self.__bVerifyChecksum else None
+					(sftpClient, fnClose) = self.__fnOpenSftpClient()
+					try:
+						with sftpClient.open(remoteFilePath, mode="r+b") as fd:
+							fd.set_pipelined(True)
+							fd.seek(offset)
+							pos = offset
+							end = offset + length
+							while pos < end:
+								data = os.pread(fdIn, min(blockSize, end - pos), pos)
+								if not data:
+									raise Exception("Local file has been modified during upload: " + localFilePath)
+								fd.write(data)
+								if digest != None:
+									digest.update(data)
+								pos += len(data)
+						if digest != None:
+							if self.__readRemoteSegmentDigest(sftpClient, remoteFilePath, offset, length) != digest.digest():
+								raise Exception("Checksum mismatch in segment at offset " + str(offset) + ": " + remoteFilePath)
+					finally:
+						fnClose()
+
+				self.__performConcurrently(uploadSegment, segments)
+
+				remoteFileSize = sftpClient.stat(remoteFilePath).st_size
+				if remoteFileSize != fileSize:
+					raise Exception("Size mismatch after upload: " + str(remoteFileSize) + " bytes instead of " + str(fileSize) + " bytes: " + remoteFilePath)
+			finally:
+				fnClose()
+		finally:
+			os.close(fdIn)
+
+	#
+
+
+
+	#
+	# Download a remote file.
+	#
+	# @param		str remoteFilePath			The absolute path of the remote file
+	# @param		str localFilePath			The path of the local file. If this file exists it is overwritten.
+	#
+	def download(self, remoteFilePath, localFilePath):
+		blockSize = self.__blockSize
+
+		(sftpClient, fnClose) = self.__fnOpenSftpClient()
+		try:
+			fileSize = sftpClient.stat(remoteFilePath).st_size
+		finally:
+			fnClose()
+		segments = self.__getSegments(fileSize)
+
+		fdOut = os.open(localFilePath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+		try:
+			# allocate the target file; the segments are written into it in place
+			os.ftruncate(fdOut, fileSize)
+
+			def downloadSegment(offset, length):
+				digest = hashlib.sha256() if self.__bVerifyChecksum else None
+				(sftpClient, fnClose) = self.__fnOpenSftpClient()
+				try:
+					with sftpClient.open(remoteFilePath, mode="rb") as fd:
+						fd.seek(offset)
+						fd.prefetch(offset + length)
+						pos = offset
+						end = offset + length
+						while pos < end:
+							data = fd.read(min(blockSize, end - pos))
+							if not data:
+								raise Exception("Remote file has been modified during download: " + remoteFilePath)
+							os.pwrite(fdOut, data, pos)
+							if digest != None:
+								digest.update(data)
+							pos += len(data)
+				finally:
+					fnClose()
+				if digest != None:
+					if self.__readLocalSegmentDigest(localFilePath, offset, length) != digest.digest():
+						raise Exception("Checksum mismatch in segment at offset " + str(offset) + ": " + localFilePath)
+
+			self.__performConcurrently(downloadSegment, segments)
+
+			localFileSize = os.fstat(fdOut).st_size
+			if localFileSize != fileSize:
+				raise Exception("Size mismatch after download: " + str(localFileSize) + " bytes instead of " + str(fileSize) + " bytes: " + localFilePath)
+		finally:
+			os.close(fdOut)
+
+	#
+
+
+
+	def __readRemoteSegmentDigest(self, sftpClient, remoteFilePath, offset, length):
+		digest = hashlib.sha256()
+		with sftpClient.open(remoteFilePath, mode="rb") as fd:
+			fd.seek(offset)
+			fd.prefetch(offset + length)
+			n = length
+			while n > 0:
+				data = fd.read(min(self.__blockSize, n))
+				if not data:
+					break
+				digest.update(data)
+				n -= len(data)
+		return digest.digest()
+
+	#
+
+
+
+	def __readLocalSegmentDigest(self, localFilePath, offset, length):
+		digest = hashlib.sha256()
+		fd = os.open(localFilePath, os.O_RDONLY)
+		try:
+			pos = offset
+			end = offset + length
+			while pos < end:
+				data = os.pread(fd, min(self.__blockSize, end - pos), pos)
+				if not data:
+					break
+				digest.update(data)
+				pos += len(data)
+		finally:
+			os.close(fd)
+		return digest.digest()
+
+	#
+
+
+
+#
+
+
+
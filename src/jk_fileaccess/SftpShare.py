@@ -7,12 +7,23 @@ import os
 import time
 import sys
 import datetime
+import functools
+import contextlib
+import queue
 import pysftp
+import paramiko
 import stat
 
 import jk_temporary
 
 from .AbstractShare import *
+from .RawFileStream import RawFileStream
+from .SegmentedSftpTransfer import SegmentedSftpTransfer
+
+
+
+# the default number of bytes to read or write with a single call
+_DEFAULT_BLOCK_SIZE = 1024 * 1024
 
 
 
@@ -25,21 +36,22 @@ from .AbstractShare import *
 class SftpShare(AbstractShare):
 
 	#
-	# @param		str tempDirPath			(optional) A temporary directory that serves as a container for file transfers.
-	#										If such a directory is provided for unknown reasons the data transfer speed is much better.
-	#										If you want to make use of that feature, provide an existing directory here.
-	#										For security reasons consider to set the mode for this directory to 0o600.
+	# @param		str tempDirPath			(deprecated) Formerly files were staged in this directory during transfers, as
+	#										<c>put()</c> and <c>get()</c> were much faster than reading and writing remote files
+	#										directly. This was due to reads and writes waiting for the server's response to every
+	#										single request. All transfers are pipelined now, so this parameter is ignored.
 	# @param		str hostName			The host to connect to
 	# @param		int port				The network port to connect to
 	# @param		str baseDir				The base directory on the remote file system
+	# @param		int numChannels			(optional) The number of SFTP channels to open over the SSH connection. Operations
+	#										invoked from different threads are performed in parallel on different channels.
+	# @param		int windowSize			(optional) The SSH window size of each SFTP channel. On links with a high latency a
+	#										larger window allows more data to be in flight. (Default: paramiko's default)
+	# @param		int maxPacketSize		(optional) The maximum SSH packet size of each SFTP channel. (Default: paramiko's default)
 	#
-	def __init__(self, tempDirPath, hostName, port, userName, password, baseDir):
+	def __init__(self, tempDirPath, hostName, port, userName, password, baseDir, numChannels = 1, windowSize = None, maxPacketSize = None):
 		if tempDirPath != None:
 			assert isinstance(tempDirPath, str)
-			assert baseDir[0] == "/"
-			if len(tempDirPath) > 1:
-				if tempDirPath.endswith("/"):
-					tempDirPath = tempDirPath[:-1]
 		assert isinstance(hostName, str)
 		assert len(hostName) > 0
 		assert isinstance(port, int)
@@ -51,20 +63,153 @@ class SftpShare(AbstractShare):
 		assert isinstance(baseDir, str)
 		assert len(baseDir) > 0
 		assert baseDir[0] == "/"
+		assert isinstance(numChannels, int)
+		assert numChannels > 0
+		if windowSize != None:
+			assert isinstance(windowSize, int)
+			assert windowSize > 0
+		if maxPacketSize != None:
+			assert isinstance(maxPacketSize, int)
+			assert maxPacketSize > 0
 		if len(baseDir) > 1:
 			if baseDir.endswith("/"):
 				baseDir = baseDir[:-1]
 		self.__baseDir = baseDir
-		self.__tempDirPath = tempDirPath
 		self.__hostName = hostName
 		self.__port = port
 		self.__userName = userName
 		self.__password = password
+		self.__windowSize = windowSize
+		self.__maxPacketSize = maxPacketSize
+		self.__blockSize = _DEFAULT_BLOCK_SIZE
+		self.__segmentedTransferSettings = None
 
 		cnopts = pysftp.CnOpts()
 		cnopts.hostkeys = None
 		self.__con = pysftp.Connection(hostName, port=port, username=userName, password=password, cnopts=cnopts)
-		self.__con.chdir(baseDir)
+		if not stat.S_ISDIR(self.__con.sftp_client.stat(baseDir).st_mode):
+			raise Exception("Not a directory: " + baseDir)
+
+		# all channels are kept in a pool; an operation checks out a channel for its duration
+		if (windowSize is None) and (maxPacketSize is None):
+			self.__sftpClients = [ self.__con.sftp_client ]
+		else:
+			self.__sftpClients = []
+		while len(self.__sftpClients) < numChannels:
+			self.__sftpClients.append(self.__openSftpClient())
+		self.__freeSftpClients = queue.Queue()
+		for sftpClient in self.__sftpClients:
+			self.__freeSftpClients.put(sftpClient)
+
+	#
+
+
+
+	#
+	# The number of SFTP channels available for performing operations in parallel.
+	#
+	@property
+	def numChannels(self):
+		return len(self.__sftpClients)
+
+	#
+
+
+
+	#
+	# Set the number of bytes read from or written to a file with a single call during transfers. paramiko splits them into
+	# requests of at most 32 KiB which are sent without waiting for the server's responses.
+	#
+	def setBlockSize(self, blockSize):
+		assert isinstance(blockSize, int)
+		assert blockSize > 0
+		self.__blockSize = blockSize
+
+	#
+
+
+
+	@property
+	def blockSize(self):
+		return self.__blockSize
+
+	#
+
+
+
+	#
+	# Enable transferring large files in segments. Files of at least <c>minFileSize</c> bytes are split into up to
+	# <c>numSegments</c> ranges that are uploaded or downloaded concurrently, each over an SFTP channel of its own. On links
+	# with a high latency this multiplies the throughput a single channel is limited to by its window size.
+	#
+	# @param		int minFileSize				The minimum size of a file to be transferred in segments. Specify <c>None</c> to
+	#											disable segmented transfers. (This is the default.)
+	# @param		int numSegments				The maximum number of segments to transfer concurrently
+	# @param		bool bVerifyChecksum		If <c>True</c> every segment is read back after the transfer and compared against
+	#											a checksum of the data transferred. This doubles the amount of data read.
+	#
+	def setSegmentedTransfers(self, minFileSize, numSegments = 4, bVerifyChecksum = False):
+		if minFileSize is None:
+			self.__segmentedTransferSettings = None
+		else:
+			assert isinstance(minFileSize, int)
+			assert minFileSize > 0
+			assert isinstance(numSegments, int)
+			assert numSegments > 0
+			assert isinstance(bVerifyChecksum, bool)
+			self.__segmentedTransferSettings = (minFileSize, numSegments, bVerifyChecksum)
+
+	#
+
+
+
+	def __openSegmentSftpClient(self):
+		sftpClient = self.__openSftpClient()
+		return (sftpClient, sftpClient.close)
+
+	#
+
+
+
+	#
+	# Check out an SFTP channel from the pool. If all channels are in use this method waits until a channel is returned.
+	#
+	@contextlib.contextmanager
+	def __leaseSftpClient(self):
+		if self.__con is None:
+			raise Exception("Connection already closed.")
+		sftpClient = self.__freeSftpClients.get()
+		try:
+			yield sftpClient
+		finally:
+			self.__freeSftpClients.put(sftpClient)
+
+	#
+
+
+
+	#
+	# Open an additional SFTP channel over the existing SSH connection. This is used for operations that keep a channel busy
+	# for a longer period of time so that they don't block the pooled channels.
+	#
+	def __openSftpClient(self):
+		if self.__con is None:
+			raise Exception("Connection already closed.")
+		return paramiko.SFTPClient.from_transport(self.__con.sftp_client.get_channel().get_transport(),
+			window_size=self.__windowSize, max_packet_size=self.__maxPacketSize)
+
+	#
+
+
+
+	def close(self):
+		if self.__con != None:
+			for sftpClient in self.__sftpClients:
+				if sftpClient is not self.__con.sftp_client:
+					sftpClient.close()
+			self.__sftpClients = []
+			self.__con.close()
+			self.__con = None
 
 	#
 
@@ -156,10 +301,18 @@ class SftpShare(AbstractShare):
 	#
 	def uploadLocalFile(self, localInputFilePath, remoteOutputFilePath, bRemoveLocalFileAfterUpload = False):
 		remotePath = self.__buildPath(remoteOutputFilePath)
-		remoteDir = os.path.dirname(remotePath)
 
-		self.__con.chdir(remoteDir)
-		self.__con.put(localInputFilePath, preserve_mtime=True)
+		with self.__leaseSftpClient() as sftpClient:
+			localStat = os.stat(localInputFilePath)
+			segmentedTransfer = self.__getSegmentedTransfer(localStat.st_size)
+			if segmentedTransfer != None:
+				segmentedTransfer.upload(localInputFilePath, remotePath)
+			else:
+				with open(localInputFilePath, "rb") as fin:
+					with sftpClient.open(remotePath, mode="wb") as fd:
+						fd.set_pipelined(True)
+						self.__copyData(fin, fd)
+			sftpClient.utime(remotePath, (localStat.st_atime, localStat.st_mtime))
 
 		if bRemoveLocalFileAfterUpload:
 			os.unlink(localInputFilePath)
@@ -168,53 +321,182 @@ class SftpShare(AbstractShare):
 
 
 
+	#
+	# Get a transfer object if a file of the specified size is to be transferred in segments.
+	#
+	# @return		SegmentedSftpTransfer		Returns a transfer object or <c>None</c>.
+	#
+	def __getSegmentedTransfer(self, fileSize):
+		if self.__segmentedTransferSettings is None:
+			return None
+		minFileSize, numSegments, bVerifyChecksum = self.__segmentedTransferSettings
+		if fileSize < minFileSize:
+			return None
+		return SegmentedSftpTransfer(self.__openSegmentSftpClient, numSegments, self.__blockSize, bVerifyChecksum)
+
+	#
+
+
+
+	#
+	# Copy all data from one file object to another in blocks of <c>blockSize</c> bytes.
+	#
+	def __copyData(self, fin, fout):
+		blockSize = self.__blockSize
+		while True:
+			data = fin.read(blockSize)
+			if not data:
+				break
+			fout.write(data)
+
+	#
+
+
+
 	def _writeAllDataToFile(self, remoteOutputFilePath, fileData, timeStamp = None):
 		remotePath = self.__buildPath(remoteOutputFilePath)
-		if self.__tempDirPath is None:
-			fd = self.__con.open(remotePath, mode='w', bufsize=65536)
-			fd.write(fileData)
+		blockSize = self.__blockSize
+		with self.__leaseSftpClient() as sftpClient:
+			with sftpClient.open(remotePath, mode="wb") as fd:
+				# don't wait for the server to acknowledge every single write
+				fd.set_pipelined(True)
+				if len(fileData) > blockSize:
+					fileData = memoryview(fileData)
+					for i in range(0, len(fileData), blockSize):
+						fd.write(fileData[i:i + blockSize])
+				else:
+					fd.write(fileData)
 			if timeStamp != None:
-				fd.utime((int(timeStamp / 1000.0), int(timeStamp / 1000.0)))
-			fd.close()
-		else:
-			remoteDir = os.path.dirname(remotePath)
-			remoteFileName = os.path.basename(remotePath)
-			localTmpPath = os.path.join(self.__tempDirPath, remoteFileName)
-			fd = open(localTmpPath, 'wb', 0o600)
-			fd.write(fileData)
-			fd.close()
+				sftpClient.utime(remotePath, (int(timeStamp / 1000.0), int(timeStamp / 1000.0)))
+	#
+
+
+
+	def _writeChunksToFile(self, remoteOutputFilePath, chunks, timeStamp = None):
+		remotePath = self.__buildPath(remoteOutputFilePath)
+		# producing the chunks might take a long time: use a channel of its own
+		sftpClient = self.__openSftpClient()
+		try:
+			with sftpClient.open(remotePath, mode="wb") as fd:
+				fd.set_pipelined(True)
+				for chunk in chunks:
+					fd.write(chunk)
 			if timeStamp != None:
-				os.utime(localTmpPath, (int(timeStamp / 1000.0), int(timeStamp / 1000.0)))
-			self.__con.chdir(remoteDir)
-			self.__con.put(localTmpPath, preserve_mtime=True)
-			os.unlink(localTmpPath)
+				sftpClient.utime(remotePath, (int(timeStamp / 1000.0), int(timeStamp / 1000.0)))
+		finally:
+			sftpClient.close()
+	#
+
+
+
+	def open(self, path, mode = "rb", bufferSize = 65536):
+		(bReadable, bWritable, bCreate, bTruncate, bAppend) = self._parseOpenMode(mode)
+		remotePath = self.__buildPath(path)
+
+		# a stream might be kept open for a long time: use a channel of its own
+		sftpClient = self.__openSftpClient()
+		try:
+			fd = sftpClient.open(remotePath, mode = mode)
+		except:
+			sftpClient.close()
+			raise
+		if bWritable:
+			# don't wait for the server to acknowledge every single write
+			fd.set_pipelined(True)
+
+		def seek(offset, whence):
+			fd.seek(offset, whence)
+			return fd.tell()
+
+		def close():
+			try:
+				fd.close()
+			finally:
+				sftpClient.close()
+
+		return self._wrapRawFileStream(
+			RawFileStream(fd.read if bReadable else None, fd.write if bWritable else None, seek, close),
+			bufferSize)
+
+	#
+
+
+
+	#
+	# All ranges are requested at once. The data is received in pipelined fashion.
+	#
+	def readRanges(self, path, ranges):
+		ranges = self._verifyRanges(ranges)
+		remotePath = self.__buildPath(path)
+		with self.__leaseSftpClient() as sftpClient:
+			with sftpClient.open(remotePath, mode = "rb") as fd:
+				fileSize = fd.stat().st_size
+				# readv() does not support reading beyond the end of the file
+				clippedRanges = []
+				for (offset, length) in ranges:
+					if offset >= fileSize:
+						clippedRanges.append((offset, 0))
+					else:
+						clippedRanges.append((offset, min(length, fileSize - offset)))
+				ret = [ b"" ] * len(clippedRanges)
+				nonEmptyIndices = [ i for i in range(0, len(clippedRanges)) if clippedRanges[i][1] > 0 ]
+				if nonEmptyIndices:
+					for (i, data) in zip(nonEmptyIndices, fd.readv([ clippedRanges[i] for i in nonEmptyIndices ])):
+						ret[i] = data
+		return ret
+
 	#
 
 
 
+	#
+	# The data is requested in advance, so the whole file is transferred without waiting for the response to every single
+	# read request.
+	#
 	def readAllDataFromFile(self, remoteInputFilePath):
 		remotePath = self.__buildPath(remoteInputFilePath)
-		if self.__tempDirPath is None:
-			fd = self.__con.open(remotePath, mode='r', bufsize=65536)
-			fileData = fd.read()
-			fd.close()
-		else:
-			remoteDir = os.path.dirname(remotePath)
-			remoteFileName = os.path.basename(remotePath)
-			localTmpPath = os.path.join(self.__tempDirPath, remoteFileName)
-			self.__con.get(remotePath, localpath=localTmpPath)
-			fd = open(localTmpPath, 'rb')
-			fileData = fd.read()
-			fd.close()
-			os.unlink(localTmpPath)
-			return fileData
+		with self.__leaseSftpClient() as sftpClient:
+			with sftpClient.open(remotePath, mode="rb") as fd:
+				fileSize = fd.stat().st_size
+				fd.prefetch(fileSize)
+				fileData = fd.read(fileSize)
+		return fileData
+	#
+
+
+
+	def downloadFile(self, remoteInputFilePath, localOutputFilePath):
+		remotePath = self.__buildPath(remoteInputFilePath)
+		with self.__leaseSftpClient() as sftpClient:
+			attrs = sftpClient.stat(remotePath)
+			segmentedTransfer = self.__getSegmentedTransfer(attrs.st_size)
+			if segmentedTransfer != None:
+				segmentedTransfer.download(remotePath, localOutputFilePath)
+			else:
+				with sftpClient.open(remotePath, mode="rb") as fd:
+					fd.prefetch(attrs.st_size)
+					with open(localOutputFilePath, "wb") as fout:
+						self.__copyData(fd, fout)
+		os.utime(localOutputFilePath, (attrs.st_atime, attrs.st_mtime))
+
+	#
+
+
+
+	#
+	# Batch operations are performed in parallel on all pooled SFTP channels.
+	#
+	def _getBatchConcurrency(self):
+		return len(self.__sftpClients)
+
 	#
 
 
 
 	def deleteEmptyDirectory(self, path):
 		remotePath = self.__buildPath(path)
-		self.__con.rmdir(remotePath)
+		with self.__leaseSftpClient() as sftpClient:
+			sftpClient.rmdir(remotePath)
 
 	#
 
@@ -225,11 +507,13 @@ class SftpShare(AbstractShare):
 		if bIgnoreErrorIfNotExists:
 			# TODO: fail if target is not a file!
 			try:
-				self.__con.remove(remotePath)
+				with self.__leaseSftpClient() as sftpClient:
+					sftpClient.remove(remotePath)
 			except:
 				return False
 		else:
-			self.__con.remove(remotePath)
+			with self.__leaseSftpClient() as sftpClient:
+				sftpClient.remove(remotePath)
 		return True
 	#
 
@@ -237,7 +521,21 @@ class SftpShare(AbstractShare):
 
 	def createDirectory(self, path):
 		remotePath = self.__buildPath(path)
-		self.__con.mkdir(remotePath)
+		with self.__leaseSftpClient() as sftpClient:
+			sftpClient.mkdir(remotePath)
+
+	#
+
+
+
+	def stat(self, path):
+		remotePath = self.__buildPath(path)
+		try:
+			with self.__leaseSftpClient() as sftpClient:
+				attrs = sftpClient.stat(remotePath)
+		except FileNotFoundError:
+			return None
+		return self._buildStatTuple(os.path.basename(remotePath), attrs.st_mode, attrs.st_uid, attrs.st_gid, attrs.st_size, attrs.st_mtime)
 
 	#
 
@@ -259,7 +557,9 @@ class SftpShare(AbstractShare):
 		else:
 			path2 = path + "/"
 		ret = []
-		for dirEntry in self.__con.listdir_attr(path):
+		with self.__leaseSftpClient() as sftpClient:
+			dirEntries = sftpClient.listdir_attr(path)
+		for dirEntry in dirEntries:
 			if stat.S_ISDIR(dirEntry.st_mode):
 				if bIncludeSubDirs:
 					ret.append(dirEntry.filename)
@@ -287,14 +587,20 @@ class SftpShare(AbstractShare):
 	#							* int: The modification time stamp in milliseconds (!) since Epoch or <c>None</c> if a directory
 	#
 	def listDirectoryContent(self, path, bIncludeSubDirs = True, bIncludeFiles = True, bIncludeOthers = True):
+		with self.__leaseSftpClient() as sftpClient:
+			return self.__listDirectoryContent(sftpClient, path, bIncludeSubDirs, bIncludeFiles, bIncludeOthers)
+
+	#
+
+
+
+	def __listDirectoryContent(self, sftpClient, path, bIncludeSubDirs, bIncludeFiles, bIncludeOthers):
 		path = self.__buildPath(path)
 		if path.endswith("/"):
 			if len(path) > 1:
 				path = path[:-1]
-		else:
-			path2 = path + "/"
 		ret = []
-		for dirEntry in self.__con.listdir_attr(path):
+		for dirEntry in sftpClient.listdir_attr(path):
 			if stat.S_ISDIR(dirEntry.st_mode):
 				if bIncludeSubDirs:
 					ret.append((dirEntry.filename, 'd', dirEntry.st_mode, dirEntry.st_uid, dirEntry.st_gid, None, None))
@@ -309,6 +615,32 @@ class SftpShare(AbstractShare):
 
 
 
+	#
+	# For listing directories concurrently the pooled SFTP channels are used. If more threads are requested additional SFTP
+	# channels are opened over the existing SSH connection for the duration of the walk.
+	#
+	def _acquireDirectoryListers(self, numThreads):
+		if numThreads <= len(self.__sftpClients):
+			return [ self.listDirectoryContent ] * numThreads
+		ret = [ self.listDirectoryContent ] * len(self.__sftpClients)
+		for i in range(len(self.__sftpClients), numThreads):
+			sftpClient = self.__openSftpClient()
+			ret.append(functools.partial(self.__listDirectoryContent, sftpClient))
+		return ret
+
+	#
+
+
+
+	def _releaseDirectoryListers(self, listers):
+		for fnList in listers:
+			if isinstance(fnList, functools.partial):
+				fnList.args[0].close()
+
+	#
+
+
+
 	def _createRandomFilePath(self, dirPath, prefix = 'tmp_', randomNameLength = 32, postfix = ''):
 		dirPath2 = self.__buildPath(dirPath)
 		dirPath = jk_temporary.createRandomFilePath(dirPath2, prefix = prefix, randomNameLength = randomNameLength, postfix = postfix)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all files with a size within a specific range.
+#
+class SizeRangeFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		int minSize			(optional) The minimum size of a file in bytes (inclusive).
+	# @param		int maxSize			(optional) The maximum size of a file in bytes (inclusive).
+	#
+	def __init__(self, minSize = None, maxSize = None):
+		if minSize != None:
+			assert isinstance(minSize, int)
+		if maxSize != None:
+			assert isinstance(maxSize, int)
+		self.__minSize = minSize
+		self.__maxSize = maxSize
+
+
+	@property
+	def minSize(self):
+		return self.__minSize
+
+
+	@property
+	def maxSize(self):
+		return self.__maxSize
+
+
+	def canAccept(self, filePath):
+		raise Exception("This filter requires file size information!")
+
+
+	def canAcceptFile(self, filePath, fileSize, timeStampNS):
+		if (self.__minSize != None) and (fileSize < self.__minSize):
+			return False
+		if (self.__maxSize != None) and (fileSize > self.__maxSize):
+			return False
+		return True
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		if fileSizes is None:
+			raise Exception("This filter requires file size information!")
+		minSize = self.__minSize if self.__minSize != None else -1
+		if self.__maxSize is None:
+			return [ fileSize >= minSize for fileSize in fileSizes ]
+		else:
+			maxSize = self.__maxSize
+			return [ minSize <= fileSize <= maxSize for fileSize in fileSizes ]
+
+
+
+
+
+
+
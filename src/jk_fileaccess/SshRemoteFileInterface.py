@@ -10,6 +10,9 @@ import sys
 import pprint							# see: https://docs.python.org/2/library/pprint.html
 from datetime import datetime
 import gzip
+import queue
+import collections
+import concurrent.futures
 
 import pysftp							# see: http://pysftp.readthedocs.io/en/release_0.2.9/
 import sh
@@ -17,6 +20,9 @@ import sh
 from jk_temporary import *
 
 from .AbstractFileInterface import AbstractFileInterface
+from .FileIndex import FileIndex
+from .StreamingFileIndex import StreamingFileIndex
+from .SegmentedSftpTransfer import SegmentedSftpTransfer
 
 
 
@@ -24,7 +30,25 @@ from .AbstractFileInterface import AbstractFileInterface
 
 class SshRemoteFileInterface(AbstractFileInterface):
 
-	def __init__(self, tempDirPath, hostname, port, userName, password, rootDirPath, fileSetName, filePathFilter):
+	#
+	# @param		str tempDirPath								A local directory that serves as a container for downloaded files
+	# @param		str hostname								The host to connect to
+	# @param		int port									The network port to connect to
+	# @param		str rootDirPath								The base directory on the remote file system
+	# @param		str fileSetName								The name of the file set
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. (optional)
+	# @param		str cacheDirPath							(optional) A local directory to store binary cache files of parsed file
+	#															indices in. If specified, the index is neither downloaded nor parsed again
+	#															as long as the remote index file has not changed.
+	# @param		bool bStreaming								(optional) If <c>True</c> the index is not loaded into memory. Instead it is
+	#															kept in the temporary directory and parsed incrementally every time data is
+	#															requested. In this mode field 1 of the tuples provided by the iterators is
+	#															<c>None</c> unless the number of entries has been determined before by
+	#															<c>countFiles()</c> or <c>countDirs()</c>. <c>cacheDirPath</c> is ignored in this mode.
+	# @param		int numParserProcesses						(optional) The number of processes to parse the index with. Parsing
+	#															very large indices benefits from using multiple processes.
+	#
+	def __init__(self, tempDirPath, hostname, port, userName, password, rootDirPath, fileSetName, filePathFilter, cacheDirPath = None, bStreaming = False, numParserProcesses = 1):
 		if not os.path.exists(tempDirPath):
 			os.mkdir(tempDirPath)
 
@@ -35,58 +59,121 @@ class SshRemoteFileInterface(AbstractFileInterface):
 		self.__tempDir = TempDir(tempDirPath, 'sftp-', None, None, 32, 0o600, 0o700)
 		self.__tempDir.clear()
 
-		self.__filePaths = []
-		self.__dirPaths = []
-		self.__fileSizes = []
-		self.__timeStamps = []
-
 		# change into target directory
 		self.__con.chdir(rootDirPath)
 
 		# download and parse file index
+		self.__fileIndex = None
+		self.__streamingFileIndex = None
 		path = self.__tempDir.createFilePath(".index.gz")
-		self.__con.get(fileSetName + ".index.gz", path)
-		nCountLines = 0
-		with gzip.open(path, mode='rt', encoding='utf-8') as fin:
-			for line in fin:
-				nCountLines += 1
-				line = line.strip('\n')
-				(sSize, sTimeStamp, sRelPath) = line.split('\t')
-				if (filePathFilter == None) or filePathFilter.canAccept(sRelPath):
-					self.__fileSizes.append(int(sSize))
-					if sRelPath.startswith("./"):
-						sRelPath = sRelPath[2:]
-					n = sRelPath.rfind('/')
-					if n > 0:
-						sRelDirPath = sRelPath[0:n]
-						if (len(self.__dirPaths) == 0) or (self.__dirPaths[len(self.__dirPaths) - 1] != sRelDirPath):
-							self.__dirPaths.append(sRelDirPath)
-					self.__filePaths.append(sRelPath)
-					timeStamp = datetime.utcfromtimestamp(float(sTimeStamp))
-					self.__timeStamps.append(timeStamp)
-		os.unlink(path)
+		if bStreaming:
+			self.__con.get(fileSetName + ".index.gz", path)
+			self.__streamingFileIndex = StreamingFileIndex(path, filePathFilter)
+		elif cacheDirPath is None:
+			self.__con.get(fileSetName + ".index.gz", path)
+			self.__fileIndex = FileIndex.loadFromIndexFile(path, filePathFilter, numParserProcesses)
+		else:
+			def downloadIndexFile():
+				if not os.path.isfile(path):
+					self.__con.get(fileSetName + ".index.gz", path)
+				return path
+			statResult = self.__con.stat(fileSetName + ".index.gz")
+			sourceID = "ssh://" + userName + "@" + hostname + ":" + str(port) + rootDirPath + "/" + fileSetName + ".index.gz"
+			self.__fileIndex = FileIndex.loadCached(cacheDirPath, sourceID, statResult.st_size, statResult.st_mtime,
+				downloadIndexFile, filePathFilter, numParserProcesses)
+		if (self.__streamingFileIndex is None) and os.path.isfile(path):
+			os.unlink(path)
 
 		# remotely change into that data directory
 		self.__con.chdir(rootDirPath + "/" + fileSetName)
 
+		self.__hostname = hostname
+		self.__port = port
+		self.__userName = userName
+		self.__password = password
 		self.__rootDirPath = rootDirPath
 		self.__fileSetName = fileSetName
+		self.__filePathFilter = filePathFilter
+
+		self.__prefetchNumFiles = 0
+		self.__prefetchNumConnections = 0
+		self.__prefetchMaxBytes = None
+		self.__segmentedTransferSettings = None
+
+
+
+	#
+	# Configure prefetching for <c>getFileIterator()</c>. If enabled, files are downloaded in the background over
+	# additional SFTP connections while the consumer processes the files already provided. The order of the files
+	# provided by the iterator is not affected by this.
+	#
+	# @param		int numFiles				The maximum number of files to download ahead of the consumer. Specify zero
+	#											to disable prefetching.
+	# @param		int numConnections			The number of additional SFTP connections to download files with.
+	# @param		int maxBytes				(optional) The maximum number of bytes downloaded files not yet provided to the
+	#											consumer may occupy in the temporary directory. At least one file is always
+	#											downloaded, even if it exceeds this limit.
+	#
+	def setPrefetching(self, numFiles, numConnections = 4, maxBytes = None):
+		assert isinstance(numFiles, int)
+		assert numFiles >= 0
+		assert isinstance(numConnections, int)
+		assert numConnections > 0
+		if maxBytes != None:
+			assert isinstance(maxBytes, int)
+			assert maxBytes > 0
+
+		self.__prefetchNumFiles = numFiles
+		self.__prefetchNumConnections = numConnections
+		self.__prefetchMaxBytes = maxBytes
+
+
+
+	#
+	# Configure segmented downloads for <c>getFileByPath()</c> and <c>getFileIterator()</c> without prefetching. Files of at
+	# least <c>minFileSize</c> bytes are split into up to <c>numConnections</c> ranges that are downloaded concurrently, each
+	# over an additional SFTP connection, and written in place into the local file.
+	#
+	# @param		int minFileSize				The minimum size of a file to be downloaded in segments. Specify <c>None</c> to
+	#											disable segmented downloads. (This is the default.)
+	# @param		int numConnections			The maximum number of segments to download concurrently.
+	# @param		bool bVerifyChecksum		If <c>True</c> every segment is read back from the local file after the download
+	#											and compared against a checksum of the data received.
+	#
+	def setSegmentedTransfers(self, minFileSize, numConnections = 4, bVerifyChecksum = False):
+		if minFileSize is None:
+			self.__segmentedTransferSettings = None
+			return
+		assert isinstance(minFileSize, int)
+		assert minFileSize > 0
+		assert isinstance(numConnections, int)
+		assert numConnections > 0
+		assert isinstance(bVerifyChecksum, bool)
+
+		self.__segmentedTransferSettings = (minFileSize, numConnections, bVerifyChecksum)
 
 
 
 	def countFiles(self):
-		return len(self.__filePaths)
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.countFiles()
+		return self.__fileIndex.countFiles()
 
 
 
 	def countDirs(self):
-		return len(self.__dirPaths)
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.countDirs()
+		return self.__fileIndex.countDirs()
 
 
 
 	def close(self):
 		self.__con.close()
 		self.__con = None
+		if self.__streamingFileIndex != None:
+			if os.path.isfile(self.__streamingFileIndex.indexFilePath):
+				os.unlink(self.__streamingFileIndex.indexFilePath)
 
 
 
@@ -115,25 +202,128 @@ class SshRemoteFileInterface(AbstractFileInterface):
 	#								described above.
 	#
 	def getFileIterator(self, filter = None):
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownFileCount if filter is None else None
+			if self.__prefetchNumFiles > 0:
+				yield from self.__getFileIteratorPrefetching(self.__streamingFileIndex.iterateFiles(filter), nmax)
+				return
+			i = 0
+			for (relFilePath, fileSize, timeStampNS) in self.__streamingFileIndex.iterateFiles(filter):
+				localPath = self.__tempDir.createFilePath()
+				remotePath = self.__rootDirPath + "/" + self.__fileSetName + "/" + relFilePath
+				self.__downloadFile(remotePath, localPath, fileSize)
+				yield (i, nmax, relFilePath, fileSize, FileIndex.timeStampNSToDateTime(timeStampNS), localPath, True)
+				i += 1
+			return
+
+		fileIndex = self.__fileIndex
 		if filter is None:
-			selectedFilePaths = self.__filePaths
+			selectedRows = range(0, fileIndex.countFiles())
 		else:
-			selectedFilePaths = []
-			for p in self.__filePaths:
-				if filter.canAccept(p):
-					selectedFilePaths.append(p)
+			selectedRows = fileIndex.selectRows(filter)
+
+		if self.__prefetchNumFiles > 0:
+			selectedFiles = ((fileIndex.getRelFilePath(row), fileIndex.getFileSize(row), fileIndex.getTimeStampNS(row)) for row in selectedRows)
+			yield from self.__getFileIteratorPrefetching(selectedFiles, len(selectedRows))
+			return
 
-		nmax = len(selectedFilePaths)
+		nmax = len(selectedRows)
 		i = 0
-		for relFilePath in selectedFilePaths:
+		for row in selectedRows:
+			relFilePath = fileIndex.getRelFilePath(row)
+			fileSize = fileIndex.getFileSize(row)
 			localPath = self.__tempDir.createFilePath()
 			remotePath = self.__rootDirPath + "/" + self.__fileSetName + "/" + relFilePath
-			self.__con.get(remotePath, localPath)
-			yield (i, nmax, relFilePath, self.__fileSizes[i], self.__timeStamps[i], localPath, True)
+			self.__downloadFile(remotePath, localPath, fileSize)
+			yield (i, nmax, relFilePath, fileSize, fileIndex.getTimeStamp(row), localPath, True)
 			i += 1
 
 
 
+	def __createConnection(self):
+		cnopts = pysftp.CnOpts()
+		cnopts.hostkeys = None
+		return pysftp.Connection(self.__hostname, port=self.__port, username=self.__userName, password=self.__password, cnopts=cnopts)
+
+
+
+	def __openSegmentSftpClient(self):
+		con = self.__createConnection()
+		return (con.sftp_client, con.close)
+
+
+
+	#
+	# Download a single file. Large files are downloaded in segments if configured by <c>setSegmentedTransfers()</c>.
+	#
+	def __downloadFile(self, remotePath, localPath, fileSize):
+		if self.__segmentedTransferSettings != None:
+			(minFileSize, numConnections, bVerifyChecksum) = self.__segmentedTransferSettings
+			if fileSize >= minFileSize:
+				SegmentedSftpTransfer(self.__openSegmentSftpClient, numConnections, bVerifyChecksum=bVerifyChecksum).download(remotePath, localPath)
+				return
+		self.__con.get(remotePath, localPath)
+
+
+
+	#
+	# Provide the files specified by downloading them in the background. Files are downloaded over a pool of
+	# additional connections: Each download checks out a connection from the pool (or creates a new one if
+	# less than the configured number of connections exist yet) and returns it after the download completed.
+	#
+	def __getFileIteratorPrefetching(self, selectedFiles, nmax):
+		idleConnections = queue.Queue()
+		allConnections = []
+
+		def download(remotePath, localPath):
+			try:
+				con = idleConnections.get_nowait()
+			except queue.Empty:
+				con = self.__createConnection()
+				allConnections.append(con)
+			try:
+				con.get(remotePath, localPath)
+			finally:
+				idleConnections.put(con)
+
+		pending = collections.deque()			# tuples of (file data, local path, future) in the order the files need to be provided
+		pendingBytes = 0
+		executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.__prefetchNumConnections)
+		try:
+			selectedFiles = iter(selectedFiles)
+			nextFile = next(selectedFiles, None)
+			i = 0
+			while pending or (nextFile != None):
+				# fill the look-ahead window
+				while (nextFile != None) and (len(pending) < self.__prefetchNumFiles + 1):
+					(relFilePath, fileSize, timeStampNS) = nextFile
+					if pending and (self.__prefetchMaxBytes != None) and (pendingBytes + fileSize > self.__prefetchMaxBytes):
+						break
+					localPath = self.__tempDir.createFilePath()
+					remotePath = self.__rootDirPath + "/" + self.__fileSetName + "/" + relFilePath
+					pending.append((nextFile, localPath, executor.submit(download, remotePath, localPath)))
+					pendingBytes += fileSize
+					nextFile = next(selectedFiles, None)
+
+				((relFilePath, fileSize, timeStampNS), localPath, future) = pending.popleft()
+				pendingBytes -= fileSize
+				future.result()
+				yield (i, nmax, relFilePath, fileSize, FileIndex.timeStampNSToDateTime(timeStampNS), localPath, True)
+				i += 1
+
+		finally:
+			# the consumer stopped early or an error occurred: discard all downloads not yet provided
+			for (fileData, localPath, future) in pending:
+				future.cancel()
+			executor.shutdown(wait=True)
+			for (fileData, localPath, future) in pending:
+				if os.path.isfile(localPath):
+					os.unlink(localPath)
+			for con in allConnections:
+				con.close()
+
+
+
 	#
 	# Return a file tuple based on the path specified.
 	#
@@ -156,16 +346,20 @@ class SshRemoteFileInterface(AbstractFileInterface):
 	# @return		tuple					Returns a file tuple.
 	#
 	def getFileByPath(self, relFilePath):
-		# TODO: optimize this!
-		i = 0
-		for relFilePath2 in self.__filePaths:
-			if relFilePath2 == relFilePath:
-				localPath = self.__tempDir.createFilePath()
-				remotePath = self.__rootDirPath + "/" + self.__fileSetName + "/" + relFilePath
-				self.__con.get(remotePath, localPath)
-				return (relFilePath, self.__fileSizes[i], self.__timeStamps[i], localPath, True)
-			i += 1
-		return None
+		if self.__streamingFileIndex != None:
+			fileData = self.__streamingFileIndex.findFile(relFilePath)
+			if fileData is None:
+				return None
+			(fileSize, timeStamp) = (fileData[0], FileIndex.timeStampNSToDateTime(fileData[1]))
+		else:
+			row = self.__fileIndex.findRow(relFilePath)
+			if row is None:
+				return None
+			(fileSize, timeStamp) = (self.__fileIndex.getFileSize(row), self.__fileIndex.getTimeStamp(row))
+		localPath = self.__tempDir.createFilePath()
+		remotePath = self.__rootDirPath + "/" + self.__fileSetName + "/" + relFilePath
+		self.__downloadFile(remotePath, localPath, fileSize)
+		return (relFilePath, fileSize, timeStamp, localPath, True)
 
 
 
@@ -183,11 +377,72 @@ class SshRemoteFileInterface(AbstractFileInterface):
 	#								described above.
 	#
 	def getFilePathIterator(self):
-		nmax = len(self.__filePaths)
-		i = 0
-		for relFilePath in self.__filePaths:
-			yield (i, nmax, relFilePath, self.__fileSizes[i], self.__timeStamps[i])
-			i += 1
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownFileCount
+			i = 0
+			for (relFilePath, fileSize, timeStampNS) in self.__streamingFileIndex.iterateFiles():
+				yield (i, nmax, relFilePath, fileSize, FileIndex.timeStampNSToDateTime(timeStampNS))
+				i += 1
+			return
+
+		fileIndex = self.__fileIndex
+		nmax = fileIndex.countFiles()
+		for i in range(0, nmax):
+			yield (i, nmax, fileIndex.getRelFilePath(i), fileIndex.getFileSize(i), fileIndex.getTimeStamp(i))
+
+
+
+	#
+	# Update the file index in place to match the current version of the remote index file. The index file is downloaded
+	# again and only the differences are applied. This is not supported in streaming mode.
+	#
+	# @param		string localIndexFilePath		(optional) The path of a local copy of a newer index file. If specified, this
+	#												file is used instead of downloading the remote index file.
+	# @return		dict							Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#												removed (key "removed") and changed (key "changed").
+	#
+	def refreshIndex(self, localIndexFilePath = None):
+		if self.__streamingFileIndex != None:
+			raise Exception("Not supported in streaming mode!")
+		if localIndexFilePath != None:
+			return self.__fileIndex.refreshFromIndexFile(localIndexFilePath, self.__filePathFilter)
+
+		path = self.__tempDir.createFilePath(".index.gz")
+		try:
+			self.__con.get(self.__rootDirPath + "/" + self.__fileSetName + ".index.gz", path)
+			return self.__fileIndex.refreshFromIndexFile(path, self.__filePathFilter)
+		finally:
+			if os.path.isfile(path):
+				os.unlink(path)
+
+
+
+	#
+	# Apply a delta file to the file index in place. See <c>FileIndex.applyDeltaFile()</c> for a description of the format.
+	# This is not supported in streaming mode.
+	#
+	# @param		string deltaFilePath		The path of a local delta file.
+	# @return		dict						Returns a dictionary containing lists of relative paths of all files added (key "added"),
+	#											removed (key "removed") and changed (key "changed").
+	#
+	def applyIndexDelta(self, deltaFilePath):
+		if self.__streamingFileIndex != None:
+			raise Exception("Not supported in streaming mode!")
+		return self.__fileIndex.applyDeltaFile(deltaFilePath, self.__filePathFilter)
+
+
+
+	#
+	# Get the directory tree of the files this object can provide. Each node of the tree provides the number of files,
+	# their total size and the newest modification time stamp, both for the files directly contained and for the whole
+	# subtree. In streaming mode the tree is built by a pass over the index on every invocation.
+	#
+	# @return	DirectoryTreeNode	Returns the root node of the tree.
+	#
+	def getDirectoryTree(self):
+		if self.__streamingFileIndex != None:
+			return self.__streamingFileIndex.getDirectoryTree()
+		return self.__fileIndex.getDirectoryTree()
 
 
 
@@ -203,9 +458,18 @@ class SshRemoteFileInterface(AbstractFileInterface):
 	#								described above.
 	#
 	def getDirPathIterator(self):
-		nmax = len(self.__dirPaths)
+		if self.__streamingFileIndex != None:
+			nmax = self.__streamingFileIndex.knownDirCount
+			i = 0
+			for relDirPath in self.__streamingFileIndex.iterateDirPaths():
+				yield (i, nmax, relDirPath)
+				i += 1
+			return
+
+		relDirPaths = self.__fileIndex.getDirPaths()
+		nmax = len(relDirPaths)
 		i = 0
-		for relDirPath in self.__dirPaths:
+		for relDirPath in relDirPaths:
 			yield (i, nmax, relDirPath)
 			i += 1
 
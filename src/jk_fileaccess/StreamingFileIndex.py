@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import os
+import gzip
+
+from .FileIndex import FileIndex
+from .DirectoryTreeNode import DirectoryTreeNode
+
+
+
+
+#
+# Instances of this class provide access to a file index without loading it into memory. Every request is served by
+# parsing the index file again, line by line. Memory consumption therefore is independent of the size of the index.
+#
+# The number of files and directories is determined on demand by a separate pass over the index file and remembered
+# afterwards.
+#
+class StreamingFileIndex(object):
+
+	#
+	# @param		str indexFilePath							The path of the index file
+	# @param		AbstractFilePathFilter filePathFilter		A file path filter object. (optional)
+	#
+	def __init__(self, indexFilePath, filePathFilter = None):
+		self.__indexFilePath = indexFilePath
+		self.__filePathFilter = filePathFilter
+		self.__countFiles = None
+		self.__countDirs = None
+
+	#
+
+
+
+	@property
+	def indexFilePath(self):
+		return self.__indexFilePath
+
+	#
+
+
+
+	#
+	# The number of files if it has been determined already, <c>None</c> otherwise.
+	#
+	@property
+	def knownFileCount(self):
+		return self.__countFiles
+
+	#
+
+
+
+	#
+	# The number of directories if it has been determined already, <c>None</c> otherwise.
+	#
+	@property
+	def knownDirCount(self):
+		return self.__countDirs
+
+	#
+
+
+
+	#
+	# Iterate over the files in the index.
+	#
+	# @param		AbstractFilePathFilter filePathFilter		An additional file path filter object that is invoked with the
+	#															relative file path. (optional)
+	# @return		iterator<tuple>								Returns an iterator that provides tuples containing the relative
+	#															file path, the file size and the time stamp in nanoseconds since epoch.
+	#
+	def iterateFiles(self, filePathFilter = None):
+		indexFilePathFilter = self.__filePathFilter
+		with gzip.open(self.__indexFilePath, mode='rt', encoding='utf-8') as fin:
+			for line in fin:
+				line = line.strip('\n')
+				(sSize, sTimeStamp, sRelPath) = line.split('\t')
+				fileSize = int(sSize)
+				timeStampNS = FileIndex.parseTimeStampNS(sTimeStamp)
+				if (indexFilePathFilter is None) or indexFilePathFilter.canAcceptFile(sRelPath, fileSize, timeStampNS):
+					if sRelPath.startswith("./"):
+						sRelPath = sRelPath[2:]
+					if (filePathFilter is None) or filePathFilter.canAcceptFile(sRelPath, fileSize, timeStampNS):
+						yield (sRelPath, fileSize, timeStampNS)
+
+	#
+
+
+
+	#
+	# Iterate over the paths of all directories that contain files, in the order they occur in the index.
+	# The root directory is not included.
+	#
+	def iterateDirPaths(self):
+		dirPathsSeen = set()
+		for (relFilePath, fileSize, timeStampNS) in self.iterateFiles():
+			n = relFilePath.rfind('/')
+			if n > 0:
+				relDirPath = relFilePath[0:n]
+				if relDirPath not in dirPathsSeen:
+					dirPathsSeen.add(relDirPath)
+					yield relDirPath
+		self.__countDirs = len(dirPathsSeen)
+
+	#
+
+
+
+	#
+	# Find the specified file.
+	#
+	# @param		str relFilePath			The relative file path
+	# @return		tuple					Returns a tuple containing the file size and the time stamp in nanoseconds
+	#										since epoch or <c>None</c> if there is no such file.
+	#
+	def findFile(self, relFilePath):
+		for (relFilePath2, fileSize, timeStampNS) in self.iterateFiles():
+			if relFilePath2 == relFilePath:
+				return (fileSize, timeStampNS)
+		return None
+
+	#
+
+
+
+	#
+	# Build the directory tree of the files in the index. This requires a pass over the index. Memory consumption depends on
+	# the number of directories.
+	#
+	# @return		DirectoryTreeNode		Returns the root node.
+	#
+	def getDirectoryTree(self):
+		dirData = {}
+		for (relFilePath, fileSize, timeStampNS) in self.iterateFiles():
+			n = relFilePath.rfind('/')
+			relDirPath = relFilePath[0:n] if n > 0 else ""
+			d = dirData.get(relDirPath)
+			if d is None:
+				dirData[relDirPath] = [ 1, fileSize, timeStampNS ]
+			else:
+				d[0] += 1
+				d[1] += fileSize
+				if timeStampNS > d[2]:
+					d[2] = timeStampNS
+		return DirectoryTreeNode.buildTree([ (k, v[0], v[1], v[2]) for (k, v) in dirData.items() ])
+
+	#
+
+
+
+	def countFiles(self):
+		if self.__countFiles is None:
+			self.__count()
+		return self.__countFiles
+
+	#
+
+
+
+	def countDirs(self):
+		if self.__countDirs is None:
+			self.__count()
+		return self.__countDirs
+
+	#
+
+
+
+	def __count(self):
+		nCountFiles = 0
+		dirPathsSeen = set()
+		for (relFilePath, fileSize, timeStampNS) in self.iterateFiles():
+			nCountFiles += 1
+			n = relFilePath.rfind('/')
+			if n > 0:
+				dirPathsSeen.add(relFilePath[0:n])
+		self.__countFiles = nCountFiles
+		self.__countDirs = len(dirPathsSeen)
+
+	#
+
+
+
+#
+
+
+
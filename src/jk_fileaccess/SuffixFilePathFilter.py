@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all file paths that end with a suffix, f.e. a file extension. One or more suffixes can be specified.
+#
+class SuffixFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		str|str[] suffix		A single suffix or a list of suffixes.
+	#
+	def __init__(self, suffix):
+		if isinstance(suffix, str):
+			self.__suffixes = ( suffix, )
+		else:
+			self.__suffixes = tuple(suffix)
+			assert len(self.__suffixes) > 0
+			for s in self.__suffixes:
+				assert isinstance(s, str)
+		self.__regEx = AbstractFilePathFilter._compileRegExPattern(self._getRegExPattern())
+
+
+	@property
+	def suffixes(self):
+		return self.__suffixes
+
+
+	def canAccept(self, filePath):
+		return filePath.endswith(self.__suffixes)
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		suffixes = self.__suffixes
+		return [ filePath.endswith(suffixes) for filePath in filePaths ]
+
+
+	def _getRegExPattern(self):
+		return ".*(?:" + "|".join([ re.escape(s) for s in self.__suffixes ]) + ")\\Z"
+
+
+	def _getCompiledRegEx(self):
+		return self.__regEx
+
+
+
+
+
+
+
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+
+
+import re
+from datetime import datetime
+
+from .AbstractFilePathFilter import AbstractFilePathFilter
+
+
+
+#
+# This filter accepts all files with a last modification time stamp within a specific range.
+#
+class TimeStampRangeFilePathFilter(AbstractFilePathFilter):
+
+	#
+	# @param		datetime|int|float minTimeStamp		(optional) The earliest time stamp (inclusive). Either a <c>datetime</c> object
+	#													in UTC or the number of seconds since epoch.
+	# @param		datetime|int|float maxTimeStamp		(optional) The latest time stamp (inclusive). Either a <c>datetime</c> object
+	#													in UTC or the number of seconds since epoch.
+	#
+	def __init__(self, minTimeStamp = None, maxTimeStamp = None):
+		self.__minTimeStampNS = TimeStampRangeFilePathFilter.__toNS(minTimeStamp)
+		self.__maxTimeStampNS = TimeStampRangeFilePathFilter.__toNS(maxTimeStamp)
+
+
+	@staticmethod
+	def __toNS(timeStamp):
+		if timeStamp is None:
+			return None
+		if isinstance(timeStamp, datetime):
+			delta = timeStamp - datetime(1970, 1, 1)
+			return (delta.days * 86400 + delta.seconds) * 1000000000 + delta.microseconds * 1000
+		if isinstance(timeStamp, (int, float)):
+			return int(timeStamp * 1000000000)
+		raise Exception("Time stamp must be specified as datetime object or in seconds since epoch!")
+
+
+	def canAccept(self, filePath):
+		raise Exception("This filter requires time stamp information!")
+
+
+	def canAcceptFile(self, filePath, fileSize, timeStampNS):
+		if (self.__minTimeStampNS != None) and (timeStampNS < self.__minTimeStampNS):
+			return False
+		if (self.__maxTimeStampNS != None) and (timeStampNS > self.__maxTimeStampNS):
+			return False
+		return True
+
+
+	def acceptMany(self, filePaths, fileSizes = None, timeStampsNS = None):
+		if timeStampsNS is None:
+			raise Exception("This filter requires time stamp information!")
+		minTimeStampNS = self.__minTimeStampNS
+		maxTimeStampNS = self.__maxTimeStampNS
+		if minTimeStampNS is None:
+			if maxTimeStampNS is None:
+				return [ True ] * len(timeStampsNS)
+			return [ t <= maxTimeStampNS for t in timeStampsNS ]
+		if maxTimeStampNS is None:
+			return [ t >= minTimeStampNS for t in timeStampsNS ]
+		return [ minTimeStampNS <= t <= maxTimeStampNS for t in timeStampsNS ]
+
+
+
+
+
+
+
@@ -8,6 +8,17 @@ from .AbstractFilePathFilter import AbstractFilePathFilter
 from .LocalFileInterface import LocalFileInterface
 from .SshRemoteFileInterface import SshRemoteFileInterface
 from .PrefixFilePathFilter import PrefixFilePathFilter
+from .SuffixFilePathFilter import SuffixFilePathFilter
+from .GlobFilePathFilter import GlobFilePathFilter
+from .RegExFilePathFilter import RegExFilePathFilter
+from .SizeRangeFilePathFilter import SizeRangeFilePathFilter
+from .TimeStampRangeFilePathFilter import TimeStampRangeFilePathFilter
+from .AndFilePathFilter import AndFilePathFilter
+from .OrFilePathFilter import OrFilePathFilter
+from .NotFilePathFilter import NotFilePathFilter
+from .FileIndex import FileIndex
+from .StreamingFileIndex import StreamingFileIndex
+from .DirectoryTreeNode import DirectoryTreeNode
 
 from .AbstractShare import AbstractShare
 from .LocalShare import LocalShare